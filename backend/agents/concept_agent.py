@@ -1,8 +1,8 @@
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
-import json
-import re
+
+from agents.streaming import iter_json_array
 
 load_dotenv()
 
@@ -11,21 +11,17 @@ llm = ChatOpenAI(
     temperature=0.6
 )
 
-def clean_json_response(text: str) -> str:
-    """Remove markdown code blocks and extract JSON."""
-    text = re.sub(r'```json\s*', '', text)
-    text = re.sub(r'```\s*', '', text)
-    return text.strip()
-
 def estimate_lecture_minutes(text: str) -> int:
     """Rough estimate: ~150 words per minute of speech."""
     word_count = len(text.split())
     return max(1, word_count // 150)
 
-def extract_concepts(lecture_text: str):
+def iter_concepts(lecture_text: str, stream: bool = True):
     """
     Single-pass concept extraction with dynamic scaling based on lecture length.
     Target: 2-3 concepts per 5 minutes of content.
+
+    Yields each concept as soon as the model finishes writing it.
     """
     
     lecture_minutes = estimate_lecture_minutes(lecture_text)
@@ -88,42 +84,53 @@ JSON OUTPUT:
 """)
 
     concept_chain = concept_prompt | llm
-    response = concept_chain.invoke(
-        {
-            "lecture_text": lecture_text[:4000],
-            "lecture_minutes": lecture_minutes,
-            "target_concepts": target_concepts
-        }
-    )
-
-    try:
-        cleaned = clean_json_response(response.content)
-        concepts = json.loads(cleaned)
-        
-        if not isinstance(concepts, list):
-            print(f"Warning: Expected list, got {type(concepts)}")
-            return []
-        
-        concepts = concepts[:target_concepts + 2]
-        
-        if len(concepts) > 5:
-            concepts = [c for c in concepts if c.get("popularity", 0) >= 2]
-        
-        for i, c in enumerate(concepts):
-            if "id" not in c or not c["id"]:
-                c["id"] = f"C{i+1}"
-        
-        print(f"✓ Extracted {len(concepts)} concepts")
-        
-        pop_counts = {}
-        for c in concepts:
-            pop = c.get("popularity", 3)
-            pop_counts[pop] = pop_counts.get(pop, 0) + 1
-        print(f"  Popularity: {dict(sorted(pop_counts.items(), reverse=True))}")
-        
-        return concepts
-        
-    except json.JSONDecodeError as e:
-        print(f"JSON decode error: {e}")
-        print(f"Response was: {response.content[:300]}")
-        return []
+    inputs = {
+        "lecture_text": lecture_text[:4000],
+        "lecture_minutes": lecture_minutes,
+        "target_concepts": target_concepts
+    }
+
+    # Low-popularity concepts are only dropped once there are more than five,
+    # so hold the first five back until we know which case applies.
+    max_concepts = target_concepts + 2
+    pending = []
+    received = 0
+
+    for c in iter_json_array(concept_chain, inputs, stream=stream):
+        if not isinstance(c, dict):
+            continue
+
+        received += 1
+        if received > max_concepts:
+            break
+
+        if "id" not in c or not c["id"]:
+            c["id"] = f"C{received}"
+
+        if received <= 5:
+            pending.append(c)
+            continue
+
+        if pending:
+            yield from (p for p in pending if p.get("popularity", 0) >= 2)
+            pending = []
+
+        if c.get("popularity", 0) >= 2:
+            yield c
+
+    yield from pending
+
+
+def extract_concepts(lecture_text: str, stream: bool = True):
+    """Extract the core concepts of a lecture chunk as a list."""
+    concepts = list(iter_concepts(lecture_text, stream=stream))
+
+    print(f"✓ Extracted {len(concepts)} concepts")
+
+    pop_counts = {}
+    for c in concepts:
+        pop = c.get("popularity", 3)
+        pop_counts[pop] = pop_counts.get(pop, 0) + 1
+    print(f"  Popularity: {dict(sorted(pop_counts.items(), reverse=True))}")
+
+    return concepts
@@ -3,8 +3,17 @@
 from dotenv import load_dotenv
 from langchain_community.chat_models import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
-import json
-import re
+import os
+
+from agents.streaming import iter_json_array
+from agents.prompt_encoding import (
+    encode_concepts,
+    encode_edges,
+    count_tokens,
+    prompt_tokens,
+    truncate_to_tokens,
+    split_to_budget
+)
 
 load_dotenv()
 
@@ -13,17 +22,19 @@ llm = ChatOpenAI(
     temperature=0.3
 )
 
-def clean_json_response(text: str) -> str:
-    """Remove markdown code blocks and extract JSON."""
-    text = re.sub(r'```json\s*', '', text)
-    text = re.sub(r'```\s*', '', text)
-    return text.strip()
+# Prompts larger than this are trimmed, split or at least reported
+PROMPT_TOKEN_BUDGET = int(os.getenv("DEPENDENCY_PROMPT_TOKEN_BUDGET", "12000"))
 
+# Concept columns each pass actually needs
+THEMATIC_FIELDS = ("id", "label", "type", "popularity")
+CONCEPTUAL_FIELDS = ("id", "label", "type", "popularity", "description")
+CANDIDATE_FIELDS = ("id", "label", "type", "popularity")
+ISOLATED_FIELDS = ("id", "label", "type", "description")
 
 POPULARITY_AWARE_PROMPT = ChatPromptTemplate.from_template("""
 You are identifying relationships between concepts with POPULARITY-BASED edge density.
 
-CONCEPTS (with popularity 1-5):
+CONCEPTS (one per line, columns named in the first row; popularity 1-5):
 {concepts}
 
 LECTURE CONTEXT:
@@ -72,13 +83,13 @@ JSON OUTPUT:
 CONNECTIVITY_PROMPT = ChatPromptTemplate.from_template("""
 You are ensuring ALL concepts have at least one connection.
 
-CONCEPTS:
+CONNECTED CONCEPTS (one per line, columns named in the first row):
 {concepts}
 
 ISOLATED CONCEPTS (need edges):
 {isolated_concepts}
 
-EXISTING EDGES:
+EXISTING EDGES (sample):
 {existing_edges}
 
 INSTRUCTIONS:
@@ -88,6 +99,7 @@ INSTRUCTIONS:
    - Logical dependencies
    - Contextual relationships
 3. Prefer connecting to high-popularity concepts when relevant
+   (isolated concepts may also connect to each other)
 4. Ensure edges make logical sense
 
 OUTPUT: Return ONLY valid JSON array, no markdown.
@@ -117,80 +129,70 @@ def calculate_target_edges(concepts):
     return int(total / 2)
 
 
-def extract_dependencies(concepts, lecture_text: str, focus="thematic"):
-    """Extract popularity-aware dependencies from lecture context."""
+def warn_if_over_budget(tokens: int, label: str):
+    if tokens > PROMPT_TOKEN_BUDGET:
+        print(f"  Warning: {label} prompt is {tokens} tokens (budget {PROMPT_TOKEN_BUDGET})")
+
+
+def iter_dependencies(concepts, lecture_text: str, focus="thematic", stream: bool = True):
+    """Yield popularity-aware dependencies from lecture context as they stream in."""
     
     target_edges = calculate_target_edges(concepts)
     print(f"  Target edges based on popularity: {target_edges}")
     
-    chain = POPULARITY_AWARE_PROMPT | llm
-    response = chain.invoke({
-        "concepts": json.dumps(concepts, indent=2),
+    inputs = {
+        "concepts": encode_concepts(concepts, THEMATIC_FIELDS),
         "lecture_text": lecture_text,
         "target_edges": target_edges
-    })
-
-    try:
-        cleaned = clean_json_response(response.content)
-        edges = json.loads(cleaned)
-        
-        if not isinstance(edges, list):
-            print(f"Warning: Expected list, got {type(edges)}")
-            return []
-            
-        return edges
-        
-    except json.JSONDecodeError as e:
-        print(f"JSON decode error in dependencies: {e}")
-        return []
+    }
+
+    # The lecture excerpt is the only part that can shrink to fit the budget
+    tokens = prompt_tokens(POPULARITY_AWARE_PROMPT, inputs)
+    if tokens > PROMPT_TOKEN_BUDGET and lecture_text:
+        keep = count_tokens(lecture_text) - (tokens - PROMPT_TOKEN_BUDGET)
+        print(f"  Trimming lecture context to fit {PROMPT_TOKEN_BUDGET} token budget")
+        inputs["lecture_text"] = truncate_to_tokens(lecture_text, keep)
+        tokens = prompt_tokens(POPULARITY_AWARE_PROMPT, inputs)
+    warn_if_over_budget(tokens, "Thematic dependency")
+    print(f"  Thematic prompt: {tokens} tokens")
 
+    chain = POPULARITY_AWARE_PROMPT | llm
+    yield from iter_json_array(chain, inputs, stream=stream)
 
-def extract_conceptual_dependencies(concepts):
-    """Extract concept-to-concept relationships based on descriptions."""
-    concept_summary = [
-        {
-            "id": c["id"],
-            "label": c["label"],
-            "type": c["type"],
-            "description": c["description"],
-            "popularity": c.get("popularity", 3)
-        }
-        for c in concepts
-    ]
-    
-    # Group by popularity for better prompting
-    high_priority = [c for c in concept_summary if c["popularity"] >= 4]
-    medium_priority = [c for c in concept_summary if c["popularity"] == 3]
-    low_priority = [c for c in concept_summary if c["popularity"] <= 2]
+
+def extract_dependencies(concepts, lecture_text: str, focus="thematic", stream: bool = True):
+    """Extract popularity-aware dependencies from lecture context."""
+    return list(iter_dependencies(concepts, lecture_text, focus=focus, stream=stream))
+
+
+def iter_conceptual_dependencies(concepts, stream: bool = True):
+    """Yield concept-to-concept relationships based on descriptions."""
+    # Highest popularity first so the hubs lead the table
+    ordered = sorted(concepts, key=lambda c: c.get("popularity", 3), reverse=True)
     
     target_edges = calculate_target_edges(concepts) // 2  # Second pass gets half
     
-    chain = POPULARITY_AWARE_PROMPT | llm
-    response = chain.invoke({
-        "concepts": json.dumps({
-            "high_priority": high_priority,
-            "medium_priority": medium_priority,
-            "low_priority": low_priority
-        }, indent=2),
+    inputs = {
+        "concepts": encode_concepts(ordered, CONCEPTUAL_FIELDS),
         "lecture_text": "",  # Not needed for conceptual pass
         "target_edges": target_edges
-    })
-
-    try:
-        cleaned = clean_json_response(response.content)
-        edges = json.loads(cleaned)
-        
-        if not isinstance(edges, list):
-            return []
-            
-        return edges
-        
-    except json.JSONDecodeError as e:
-        print(f"JSON decode error in conceptual dependencies: {e}")
-        return []
+    }
+
+    # Splitting would lose edges between batches, so only report overruns
+    tokens = prompt_tokens(POPULARITY_AWARE_PROMPT, inputs)
+    warn_if_over_budget(tokens, "Conceptual dependency")
+    print(f"  Conceptual prompt: {tokens} tokens")
+
+    chain = POPULARITY_AWARE_PROMPT | llm
+    yield from iter_json_array(chain, inputs, stream=stream)
 
 
-def ensure_full_connectivity(concepts, existing_edges):
+def extract_conceptual_dependencies(concepts, stream: bool = True):
+    """Extract concept-to-concept relationships based on descriptions."""
+    return list(iter_conceptual_dependencies(concepts, stream=stream))
+
+
+def ensure_full_connectivity(concepts, existing_edges, stream: bool = True):
     """Ensure every concept has at least one edge."""
     
     # Find all concepts that have at least one edge
@@ -210,24 +212,37 @@ def ensure_full_connectivity(concepts, existing_edges):
     print(f"  Found {len(isolated_ids)} isolated concepts: {sorted(isolated_ids)}")
     
     isolated_concepts = [c for c in concepts if c["id"] in isolated_ids]
-    
+    connected_concepts = [c for c in concepts if c["id"] not in isolated_ids]
+
+    base_inputs = {
+        "concepts": encode_concepts(connected_concepts, CANDIDATE_FIELDS),
+        "isolated_concepts": "",
+        "existing_edges": encode_edges(existing_edges[:20])  # Sample of existing
+    }
+
+    # Split the isolated concepts across calls if they don't fit in one prompt
+    room = PROMPT_TOKEN_BUDGET - prompt_tokens(CONNECTIVITY_PROMPT, base_inputs)
+    if room <= 0:
+        # Splitting can't help when the connected-concept table alone is over
+        # budget; it would only turn into one call per isolated concept
+        print(f"  Warning: Connectivity prompt is over budget ({PROMPT_TOKEN_BUDGET} tokens) "
+              f"before adding isolated concepts, sending them in one prompt")
+        batches = [isolated_concepts]
+    else:
+        batches = split_to_budget(
+            isolated_concepts,
+            lambda batch: encode_concepts(batch, ISOLATED_FIELDS),
+            room
+        )
+    if len(batches) > 1:
+        print(f"  Splitting connectivity pass into {len(batches)} prompts to fit token budget")
+
     chain = CONNECTIVITY_PROMPT | llm
-    response = chain.invoke({
-        "concepts": json.dumps(concepts, indent=2),
-        "isolated_concepts": json.dumps(isolated_concepts, indent=2),
-        "existing_edges": json.dumps(existing_edges[:20], indent=2)  # Sample of existing
-    })
-
-    try:
-        cleaned = clean_json_response(response.content)
-        edges = json.loads(cleaned)
-        
-        if not isinstance(edges, list):
-            return []
-            
-        print(f"  Created {len(edges)} connectivity edges")
-        return edges
-        
-    except json.JSONDecodeError as e:
-        print(f"JSON decode error in connectivity pass: {e}")
-        return []
\ No newline at end of file
+    edges = []
+    for batch in batches:
+        inputs = dict(base_inputs, isolated_concepts=encode_concepts(batch, ISOLATED_FIELDS))
+        warn_if_over_budget(prompt_tokens(CONNECTIVITY_PROMPT, inputs), "Connectivity")
+        edges.extend(iter_json_array(chain, inputs, stream=stream))
+
+    print(f"  Created {len(edges)} connectivity edges")
+    return edges
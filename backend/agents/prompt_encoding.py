@@ -0,0 +1,94 @@
+# prompt_encoding.py - compact prompt serialization and token budgeting
+
+from functools import lru_cache
+
+DEFAULT_MODEL = "gpt-4o"
+
+
+def _cell(value) -> str:
+    # Keep one row per line and the column separator unambiguous
+    return str(value).replace("|", "/").replace("\n", " ").strip()
+
+
+def encode_concepts(concepts, fields=("id", "label", "popularity")) -> str:
+    """
+    Tabular one-line-per-concept encoding with a header row, e.g.
+
+        id | label | popularity
+        C1 | Natural Selection | 5
+
+    Only the listed fields are included, which is far smaller than indented JSON.
+    """
+    lines = [" | ".join(fields)]
+    for c in concepts:
+        lines.append(" | ".join(_cell(c.get(f, "")) for f in fields))
+    return "\n".join(lines)
+
+
+def encode_edges(edges) -> str:
+    """One edge per line as `C1 -> C2 (relation)`."""
+    return "\n".join(
+        f"{e.get('from')} -> {e.get('to')} ({e.get('relation')})" for e in edges
+    ) or "(none)"
+
+
+@lru_cache(maxsize=4)
+def _encoding(model: str):
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:  # tiktoken missing or its BPE files unavailable
+        print(f"Warning: tiktoken unavailable ({e}), estimating tokens from length")
+        return None
+
+
+def count_tokens(text: str, model: str = DEFAULT_MODEL) -> int:
+    encoding = _encoding(model)
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def prompt_tokens(prompt, inputs, model: str = DEFAULT_MODEL) -> int:
+    """Token count of a ChatPromptTemplate rendered with inputs."""
+    return count_tokens(prompt.format(**inputs), model)
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = DEFAULT_MODEL) -> str:
+    """Cut text to at most max_tokens tokens."""
+    if max_tokens <= 0:
+        return ""
+    encoding = _encoding(model)
+    if encoding is None:
+        return text[:max_tokens * 4]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+
+def split_to_budget(items, encode, max_tokens: int, model: str = DEFAULT_MODEL):
+    """
+    Group items into batches whose encode(batch) stays within max_tokens.
+
+    A single item that is too large on its own still gets a batch of its own.
+    Item costs are measured once each, so this is linear in len(items).
+    """
+    overhead = count_tokens(encode([]), model)
+    batches = []
+    current = []
+    used = overhead
+    for item in items:
+        cost = max(1, count_tokens(encode([item]), model) - overhead)
+        if current and used + cost > max_tokens:
+            batches.append(current)
+            current = []
+            used = overhead
+        current.append(item)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
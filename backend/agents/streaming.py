@@ -0,0 +1,130 @@
+# streaming.py - incremental parsing of JSON arrays from streamed LLM output
+
+import json
+import re
+
+
+def clean_json_response(text: str) -> str:
+    """Remove markdown code blocks and extract JSON."""
+    text = re.sub(r'```json\s*', '', text)
+    text = re.sub(r'```\s*', '', text)
+    return text.strip()
+
+
+class IncrementalJSONArrayParser:
+    """
+    Parse a top-level JSON array of objects fed in arbitrary text chunks.
+
+    Each object is returned by feed() as soon as its closing brace arrives,
+    so callers can act on it before the rest of the array has been generated.
+    Anything before the opening bracket (e.g. a ```json fence) is ignored.
+    """
+
+    def __init__(self):
+        self.started = False
+        self.done = False
+        self.count = 0
+        self.errors = 0
+        self._buffer = []
+        self._depth = 0
+        self._capturing = False
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk: str):
+        """Consume a chunk of text and return the objects it completed."""
+        items = []
+
+        for ch in chunk:
+            if self.done:
+                break
+
+            if not self.started:
+                if ch == '[':
+                    self.started = True
+                continue
+
+            if self._depth > 0 and self._capturing:
+                self._buffer.append(ch)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif self._depth == 0:
+                # Between elements of the top-level array; strings, numbers
+                # and nested arrays are skipped, only objects are captured
+                if ch in '{[':
+                    self._capturing = ch == '{'
+                    self._buffer = [ch] if self._capturing else []
+                    self._depth = 1
+                elif ch == ']':
+                    self.done = True
+            elif ch in '{[':
+                self._depth += 1
+            elif ch in '}]':
+                self._depth -= 1
+                if self._depth == 0 and self._capturing:
+                    item = self._parse_buffer()
+                    if item is not None:
+                        items.append(item)
+
+        return items
+
+    def _parse_buffer(self):
+        text = ''.join(self._buffer)
+        self._buffer = []
+        try:
+            item = json.loads(text)
+        except json.JSONDecodeError as e:
+            self.errors += 1
+            print(f"JSON decode error in streamed object: {e}")
+            return None
+        self.count += 1
+        return item
+
+    @property
+    def truncated(self) -> bool:
+        """True if the stream stopped before the array was closed."""
+        return not self.done
+
+
+def iter_json_array(chain, inputs, stream: bool = True):
+    """
+    Run a prompt chain and yield the objects of the JSON array it returns.
+
+    With stream=True tokens are parsed as they arrive and each object is
+    yielded as soon as it closes; a truncated response keeps every object
+    completed so far. With stream=False the full completion is awaited.
+    """
+    if not stream:
+        response = chain.invoke(inputs)
+        try:
+            items = json.loads(clean_json_response(response.content))
+        except json.JSONDecodeError as e:
+            print(f"JSON decode error: {e}")
+            print(f"Response was: {response.content[:300]}")
+            return
+
+        if not isinstance(items, list):
+            print(f"Warning: Expected list, got {type(items)}")
+            return
+
+        yield from items
+        return
+
+    parser = IncrementalJSONArrayParser()
+    for chunk in chain.stream(inputs):
+        yield from parser.feed(chunk.content)
+
+    if not parser.started:
+        print("Warning: Streamed response contained no JSON array")
+    elif parser.truncated:
+        print(f"Warning: Streamed response was truncated, kept {parser.count} objects")
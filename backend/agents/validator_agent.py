@@ -1,36 +1,27 @@
 # validator_agent.py
 
-def validate_edges(raw_edges, concepts):  # Fixed parameter order
+ALLOWED_RELATIONS = {"depends_on", "leads_to", "example_of", "derived_from"}
+
+
+def iter_valid_edges(raw_edges, concepts, stats=None):
     """
-    Validate that edges only reference existing concept IDs.
-    
-    Args:
-        raw_edges: List of edge dictionaries from dependency extraction
-        concepts: List of concept dictionaries
+    Yield each valid edge as soon as it arrives from raw_edges.
+
+    raw_edges may be any iterable, including a streaming generator, so edges
+    are checked while the model is still producing the rest of them.
+    Skip counters are accumulated into the optional stats dict.
     """
-    # Build valid IDs with safety check
-    valid_ids = set()
+    if stats is None:
+        stats = {}
+    for key in ("invalid_id", "self_loop", "invalid_relation", "duplicate"):
+        stats.setdefault(key, 0)
+
+    concepts_by_id = {}
     for c in concepts:
         if isinstance(c, dict) and "id" in c:
-            valid_ids.add(c["id"])
-        else:
-            print(f"Warning: Concept missing 'id' field: {c}")
-    
-    if not valid_ids:
-        print("Error: No valid concept IDs found!")
-        return []
-    
-    print(f"  Valid concept IDs ({len(valid_ids)}): {sorted(valid_ids)}")
-    
-    allowed_relations = {"depends_on", "leads_to", "example_of", "derived_from"}
+            concepts_by_id[c["id"]] = c
 
-    cleaned_edges = []
     seen = set()
-    
-    skipped_invalid_id = 0
-    skipped_self_loop = 0
-    skipped_invalid_relation = 0
-    skipped_duplicate = 0
 
     for edge in raw_edges:
         if not isinstance(edge, dict):
@@ -42,53 +33,72 @@ def validate_edges(raw_edges, concepts):  # Fixed parameter order
         rel = edge.get("relation")
 
         # Rule 1: IDs must exist
-        if src not in valid_ids or dst not in valid_ids:
-            skipped_invalid_id += 1
+        if src not in concepts_by_id or dst not in concepts_by_id:
+            stats["invalid_id"] += 1
             continue
 
         # Rule 2: No self loops
         if src == dst:
-            skipped_self_loop += 1
+            stats["self_loop"] += 1
             continue
 
         # Rule 3: Valid relation
-        if rel not in allowed_relations:
-            skipped_invalid_relation += 1
+        if rel not in ALLOWED_RELATIONS:
+            stats["invalid_relation"] += 1
             continue
 
         # Rule 4: Normalize common patterns
-        try:
-            src_concept = next(c for c in concepts if c.get("id") == src)
-            dst_concept = next(c for c in concepts if c.get("id") == dst)
-            
-            src_type = src_concept.get("type")
-            dst_type = dst_concept.get("type")
+        src_type = concepts_by_id[src].get("type")
+        dst_type = concepts_by_id[dst].get("type")
 
-            if src_type == "algorithm" and dst_type == "parameter":
-                rel = "depends_on"
-        except StopIteration:
-            print(f"Warning: Could not find concept for edge {src} -> {dst}")
-            continue
+        if src_type == "algorithm" and dst_type == "parameter":
+            rel = "depends_on"
 
         # Rule 5: No duplicates
         key = (src, dst, rel)
         if key in seen:
-            skipped_duplicate += 1
+            stats["duplicate"] += 1
             continue
 
         seen.add(key)
-        cleaned_edges.append({
+        yield {
             "from": src,
             "to": dst,
             "relation": rel
-        })
+        }
+
+
+def validate_edges(raw_edges, concepts):  # Fixed parameter order
+    """
+    Validate that edges only reference existing concept IDs.
+    
+    Args:
+        raw_edges: Edge dictionaries from dependency extraction (any iterable)
+        concepts: List of concept dictionaries
+    """
+    # Build valid IDs with safety check
+    valid_ids = set()
+    for c in concepts:
+        if isinstance(c, dict) and "id" in c:
+            valid_ids.add(c["id"])
+        else:
+            print(f"Warning: Concept missing 'id' field: {c}")
+    
+    if not valid_ids:
+        print("Error: No valid concept IDs found!")
+        return []
+    
+    print(f"  Valid concept IDs ({len(valid_ids)}): {sorted(valid_ids)}")
+    
+    stats = {}
+    cleaned_edges = list(iter_valid_edges(raw_edges, concepts, stats))
 
     # Print validation summary
     print(f"  Validation summary:")
-    print(f"    - Invalid IDs: {skipped_invalid_id}")
-    print(f"    - Self-loops: {skipped_self_loop}")
-    print(f"    - Invalid relations: {skipped_invalid_relation}")
-    print(f"    - Duplicates: {skipped_duplicate}")
+    print(f"    - Invalid IDs: {stats['invalid_id']}")
+    print(f"    - Self-loops: {stats['self_loop']}")
+    print(f"    - Invalid relations: {stats['invalid_relation']}")
+    print(f"    - Duplicates: {stats['duplicate']}")
     print(f"    - Valid edges: {len(cleaned_edges)}")
 
     return cleaned_edges
\ No newline at end of file
@@ -3,22 +3,33 @@ from flask_cors import CORS
 from werkzeug.utils import secure_filename
 import os
 import json
+import threading
+import uuid
 from pathlib import Path
 
 from audio_detection import audio_to_text
-from agents.concept_agent import extract_concepts
+from agents.concept_agent import iter_concepts
 from agents.dependency_agent import (
-    extract_dependencies, 
-    extract_conceptual_dependencies,
+    iter_dependencies,
+    iter_conceptual_dependencies,
     ensure_full_connectivity
 )
 from agents.validator_agent import validate_edges
+from search_index import TranscriptIndex, IndexRegistry
+from scheduler import Stage, run_stages
+from wire_format import encode_response, compress_response, GraphHistory
+from clustering import ClusterHierarchy
+from upload_store import UploadStore
 
 app = Flask(__name__, static_folder='build', static_url_path='')
 
 # Simple CORS - allow all origins for development
 CORS(app, origins="*", supports_credentials=False)
 
+# Compact JSON even under debug, and gzip/brotli when the client accepts it
+app.json.compact = True
+app.after_request(compress_response)
+
 # Configuration
 UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'mp3', 'mp4', 'wav', 'ogg', 'm4a', 'flac'}
@@ -26,6 +37,12 @@ Path(UPLOAD_FOLDER).mkdir(exist_ok=True)
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 500 * 1024 * 1024  # 500MB max file size
+app.config['UPLOAD_QUOTA_BYTES'] = int(os.getenv('UPLOAD_QUOTA_BYTES', 2 * 1024 * 1024 * 1024))  # 2GB on disk
+app.config['CLUSTER_MIN_CONCEPTS'] = 40  # larger graphs are sent as collapsed clusters
+app.config['CLUSTER_MAX_CHILDREN'] = 8
+
+# Uploads are stored by content hash and evicted least-recently-used
+upload_store = UploadStore(UPLOAD_FOLDER, max_bytes=app.config['UPLOAD_QUOTA_BYTES'])
 
 # Store the latest graph in memory
 current_graph = {
@@ -33,6 +50,81 @@ current_graph = {
     "edges": []
 }
 
+# Versioned snapshots of current_graph for delta responses
+graph_history = GraphHistory(max_versions=20)
+graph_lock = threading.Lock()
+
+# Transcript search indexes for recently built graphs, keyed by graph_id
+search_indexes = IndexRegistry(max_graphs=32)
+
+# With several worker processes (see wsgi.py) the current graph and the
+# transcripts are also kept on disk so every worker serves the same data
+STATE_DIR = os.getenv('MINDMAP_STATE_DIR')
+shared_state = None
+if STATE_DIR:
+    from shared_state import SharedGraphState  # Linux/macOS only (fcntl)
+    shared_state = SharedGraphState(STATE_DIR, max_graphs=search_indexes.max_graphs)
+
+
+def set_current_graph(graph):
+    """Make graph the current mindmap and return its version."""
+    global current_graph
+    with graph_lock:
+        version = shared_state.publish(graph) if shared_state else None
+        current_graph = graph
+        return graph_history.commit(graph, version)
+
+
+def sync_current_graph():
+    """Pick up a graph published by another worker process."""
+    global current_graph
+    if shared_state is None:
+        return
+    with graph_lock:
+        published = shared_state.load_if_changed()
+        if published is not None:
+            current_graph, version = published
+            graph_history.commit(current_graph, version)
+
+
+# Cluster hierarchy of the current graph, rebuilt when the version changes
+current_hierarchy = {"version": None, "tree": None}
+
+
+def build_hierarchy(graph):
+    return ClusterHierarchy(
+        graph["concepts"],
+        graph["edges"],
+        max_children=app.config['CLUSTER_MAX_CHILDREN']
+    )
+
+
+def get_hierarchy():
+    """Cluster hierarchy of the current graph, with that graph's version and graph_id."""
+    with graph_lock:
+        version, graph = graph_history.version, current_graph
+        if current_hierarchy["version"] != version:
+            current_hierarchy["tree"] = build_hierarchy(graph)
+            current_hierarchy["version"] = version
+        return current_hierarchy["tree"], version, graph.get('graph_id')
+
+
+def get_search_index(graph_id):
+    """Search index for graph_id, rebuilt from shared state if built elsewhere."""
+    index = search_indexes.get(graph_id)
+    if index is not None or shared_state is None:
+        return index
+
+    stored = shared_state.load_transcript(graph_id)
+    if stored is None:
+        return None
+
+    transcript, concepts = stored
+    index = TranscriptIndex.from_transcript(transcript)
+    index.link_concepts(concepts)
+    search_indexes.add(graph_id, index)
+    return index
+
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -72,36 +164,44 @@ def build_lecture_graph(audio_path: str):
 
     print(f"Transcript length: {len(lecture_text)} characters")
 
+    graph_id = uuid.uuid4().hex[:12]
+    index = TranscriptIndex.from_transcript(lecture_text)
+    print(f"Indexed {len(index.segments)} transcript segments")
+
     print("\n[2] Chunking lecture text...")
     chunks = chunk_text(lecture_text, chunk_size=4000, overlap=500)
     print(f"Created {len(chunks)} chunks")
 
     print("\n[3] Extracting concepts per chunk...")
     concepts = []
-    seen_labels = {}
+    seen_words = []
     
     for i, chunk in enumerate(chunks):
         print(f"  Processing chunk {i+1}/{len(chunks)}...")
-        chunk_concepts = extract_concepts(chunk)
+        found = 0
         
-        for c in chunk_concepts:
+        # Concepts stream in one at a time and are deduplicated on arrival
+        for c in iter_concepts(chunk):
+            if not c.get("label"):
+                continue
+            found += 1
+
             label_key = c["label"].lower().strip()
             normalized = label_key.replace("the ", "").replace("'s ", " ")
+            words1 = set(normalized.split())
             
             is_duplicate = False
-            for existing_label in seen_labels.keys():
-                words1 = set(normalized.split())
-                words2 = set(existing_label.split())
-                if len(words1 & words2) / max(len(words1), len(words2)) > 0.8:
+            for words2 in seen_words:
+                if len(words1 & words2) / max(len(words1), len(words2), 1) > 0.8:
                     is_duplicate = True
                     break
             
             if not is_duplicate:
                 c["id"] = f"C{len(concepts) + 1}"
                 concepts.append(c)
-                seen_labels[normalized] = c["id"]
+                seen_words.append(words1)
         
-        print(f"    Found {len(chunk_concepts)} concepts, {len(concepts)} total unique")
+        print(f"    Found {found} concepts, {len(concepts)} total unique")
 
     if not concepts:
         raise ValueError("No concepts extracted after chunking.")
@@ -115,33 +215,55 @@ def build_lecture_graph(audio_path: str):
     print(f"  Popularity distribution: {dict(sorted(pop_dist.items()))}")
 
     print("\n[5] Extracting dependencies (popularity-aware)...")
-    all_edges = []
     
-    print("  Pass 1: Thematic relationships...")
-    thematic_edges = extract_dependencies(concepts, lecture_text[:8000], focus="thematic")
-    all_edges.extend(thematic_edges)
-    print(f"    Found {len(thematic_edges)} thematic edges")
+    # Passes 1 and 2 only need the concept list, so they run concurrently;
+    # edges are validated as they stream in from each pass.
+    def thematic_pass():
+        edges = validate_edges(
+            iter_dependencies(concepts, lecture_text[:8000], focus="thematic"),
+            concepts
+        )
+        print(f"    Pass 1 (thematic): {len(edges)} valid edges")
+        return edges
+
+    def conceptual_pass():
+        edges = validate_edges(iter_conceptual_dependencies(concepts), concepts)
+        print(f"    Pass 2 (conceptual): {len(edges)} valid edges")
+        return edges
+
+    def merge_passes(thematic_edges, concept_edges):
+        edges = validate_edges(thematic_edges + concept_edges, concepts)
+        print(f"    Valid edges after initial passes: {len(edges)}")
+        return edges
+
+    def connectivity_pass(validated_edges):
+        print("  Pass 3: Ensuring all concepts are connected...")
+        return ensure_full_connectivity(concepts, validated_edges)
+
+    print("  Passes 1+2: Thematic and conceptual relationships (concurrent)...")
+    results = run_stages([
+        Stage("thematic", thematic_pass),
+        Stage("conceptual", conceptual_pass),
+        Stage("merged", merge_passes, deps=("thematic", "conceptual")),
+        Stage("connectivity", connectivity_pass, deps=("merged",)),
+    ])
+    validated_edges = results["merged"]
+    connectivity_edges = results["connectivity"]
     
-    print("  Pass 2: Concept interdependencies...")
-    concept_edges = extract_conceptual_dependencies(concepts)
-    all_edges.extend(concept_edges)
-    print(f"    Found {len(concept_edges)} conceptual edges")
-    
-    print("  Validating intermediate edges...")
-    validated_edges = validate_edges(all_edges, concepts)
-    print(f"    Valid edges after initial passes: {len(validated_edges)}")
-    
-    print("  Pass 3: Ensuring all concepts are connected...")
-    connectivity_edges = ensure_full_connectivity(concepts, validated_edges)
-    all_edges.extend(connectivity_edges)
-    
-    print(f"  Total raw edges: {len(all_edges)}")
+    print(f"  Edges before final validation: {len(validated_edges)} validated + "
+          f"{len(connectivity_edges)} connectivity")
 
     print("\n[6] Final validation...")
-    edges = validate_edges(all_edges, concepts)
+    edges = validate_edges(validated_edges + connectivity_edges, concepts)
     print(f"Final validated edges: {len(edges)}")
 
+    index.link_concepts(concepts)
+    search_indexes.add(graph_id, index)
+    if shared_state:
+        shared_state.save_transcript(graph_id, lecture_text, concepts)
+
     return {
+        "graph_id": graph_id,
         "concepts": concepts,
         "edges": edges
     }
@@ -157,15 +279,44 @@ def serve_react():
 
 @app.route('/api/mindmap-data', methods=['GET'])
 def get_mindmap_data():
-    """Get the current mindmap data."""
-    return jsonify(current_graph)
+    """
+    Get the current mindmap data.
+
+    With ?since=<version> only the concepts and edges changed since that
+    version are returned, or the full graph if it is no longer retained.
+    With ?view=clustered only the top level of the cluster hierarchy is sent.
+    """
+    since = request.args.get('since', type=int)
+    sync_current_graph()
+
+    if request.args.get('view') == 'clustered':
+        hierarchy, version, graph_id = get_hierarchy()
+        top = hierarchy.top_level()
+        return encode_response({
+            'version': version,
+            'graph_id': graph_id,
+            'clustered': True,
+            'concepts': top['concepts'],
+            'edges': top['edges']
+        })
+
+    with graph_lock:
+        if since is not None:
+            delta = graph_history.delta(since)
+            if delta is not None:
+                return encode_response(delta)
+
+        return encode_response({
+            'version': graph_history.version,
+            'graph_id': current_graph.get('graph_id'),
+            'concepts': current_graph['concepts'],
+            'edges': current_graph['edges']
+        })
 
 
 @app.route('/api/upload-audio', methods=['POST'])
 def upload_audio():
     """Handle audio file upload and process it."""
-    global current_graph
-    
     if 'audio' not in request.files:
         return jsonify({'error': 'No audio file provided'}), 400
     
@@ -178,41 +329,45 @@ def upload_audio():
         return jsonify({'error': 'Invalid file type. Allowed: mp3, mp4, wav, ogg, m4a, flac'}), 400
     
     try:
-        # Save the uploaded file
+        # Stream the upload to disk, stored once per distinct content
         filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
-        
-        print(f"\n{'='*60}")
-        print(f"Processing uploaded file: {filename}")
-        print(f"{'='*60}")
-        
-        # Process the audio file
-        graph = build_lecture_graph(filepath)
+        extension = file.filename.rsplit('.', 1)[1].lower()
+        with upload_store.save(file, extension) as (filepath, digest, is_new):
+            print(f"\n{'='*60}")
+            print(f"Processing uploaded file: {filename} ({digest[:12]}{'' if is_new else ', already stored'})")
+            print(f"{'='*60}")
+
+            # Process the audio file; it can't be evicted until the block exits
+            graph = build_lecture_graph(str(filepath))
         
         # Update the current graph
-        current_graph = graph
-        
-        # Clean up the uploaded file (optional)
-        # os.remove(filepath)
+        version = set_current_graph(graph)
+
+        # Large graphs start collapsed; clients expand clusters on demand
+        clustered = len(graph['concepts']) >= app.config['CLUSTER_MIN_CONCEPTS']
+        # Built from this request's graph; another upload may already be current
+        data = build_hierarchy(graph).top_level() if clustered else {
+            'concepts': graph['concepts'],
+            'edges': graph['edges']
+        }
         
         print(f"\n{'='*60}")
         print(f"Processing complete!")
         print(f"Concepts: {len(graph['concepts'])}, Edges: {len(graph['edges'])}")
         print(f"{'='*60}\n")
         
-        return jsonify({
+        return encode_response({
             'success': True,
             'message': f'Processed {filename} successfully',
             'filename': filename,
-            'filepath': filepath,
+            'graph_id': graph['graph_id'],
+            'version': version,
             'stats': {
                 'concepts': len(graph['concepts']),
                 'edges': len(graph['edges'])
             },
-            'data': graph,
-            'concepts': graph['concepts'],
-            'edges': graph['edges']
+            'clustered': clustered,
+            'data': data
         })
         
     except Exception as e:
@@ -225,20 +380,101 @@ def upload_audio():
             'trace': error_trace
         }), 500
 
+    finally:
+        # Keep the uploads folder within its quota once processing is done
+        upload_store.evict()
+
+
+@app.route('/api/clusters/<cluster_id>', methods=['GET'])
+def expand_cluster(cluster_id):
+    """
+    Expand a cluster of the current graph into its children.
+
+    ?visible=<id,id,...> lists the nodes the client is showing, so edges from
+    the new children can be attached to whichever of them contains the other end.
+    ?graph_id= and ?version= identify the graph the client's clusters came from;
+    cluster ids are reused by every graph, so a mismatch is a 409.
+    """
+    visible = [v for v in request.args.get('visible', '').split(',') if v]
+    client_graph_id = request.args.get('graph_id')
+    client_version = request.args.get('version', type=int)
+    sync_current_graph()
+
+    hierarchy, version, graph_id = get_hierarchy()
+    stale = (
+        (client_graph_id is not None and client_graph_id != graph_id)
+        or (client_version is not None and client_version != version)
+    )
+    if stale:
+        return jsonify({
+            'error': 'The mindmap has changed since these clusters were loaded',
+            'graph_id': graph_id,
+            'version': version
+        }), 409
+    if not hierarchy.is_cluster(cluster_id):
+        return jsonify({'error': f'Unknown cluster: {cluster_id}'}), 404
+
+    result = hierarchy.expand(cluster_id, visible)
+    result['version'] = version
+    return encode_response(result)
+
+
+@app.route('/api/search', methods=['GET'])
+def search_transcript():
+    """Find where in the lecture a query or concept is discussed."""
+    query = request.args.get('q', '').strip()
+    concept_id = request.args.get('concept', '').strip()
+    graph_id = request.args.get('graph_id') or None
+    limit = max(1, min(request.args.get('limit', 10, type=int), 100))
+
+    if concept_id:
+        if not graph_id:
+            sync_current_graph()
+            graph_id = current_graph.get('graph_id')
+        index = get_search_index(graph_id) if graph_id else None
+        if index is None:
+            return jsonify({'error': 'Unknown graph_id'}), 404
+
+        seg_ids = index.concept_segments.get(concept_id)
+        if seg_ids is None:
+            return jsonify({'error': f'Unknown concept: {concept_id}'}), 404
+
+        results = []
+        for seg_id in seg_ids[:limit]:
+            result = index.segment_result(seg_id)
+            result['graph_id'] = graph_id
+            results.append(result)
+        return encode_response({'concept': concept_id, 'results': results})
+
+    if not query:
+        return jsonify({'error': 'Provide a query (q) or a concept id (concept)'}), 400
+
+    if graph_id and get_search_index(graph_id) is None:
+        return jsonify({'error': 'Unknown graph_id'}), 404
+
+    if not graph_id and shared_state:
+        # Make graphs built by other workers searchable here too
+        for gid in shared_state.recent_graph_ids(search_indexes.max_graphs):
+            get_search_index(gid)
+
+    results = search_indexes.search(query, limit=limit, graph_id=graph_id)
+    return encode_response({'query': query, 'results': results})
+
 
 @app.route('/api/clear', methods=['POST'])
 def clear_data():
     """Clear the current mindmap data."""
-    global current_graph
-    current_graph = {"concepts": [], "edges": []}
+    set_current_graph({"concepts": [], "edges": []})
     return jsonify({'success': True, 'message': 'Data cleared'})
 
 
 if __name__ == '__main__':
     print("\n🚀 Starting Flask server...")
     print("📍 API endpoints:")
-    print("   - GET  /api/mindmap-data   (get current graph)")
+    print("   - GET  /api/mindmap-data   (get current graph, ?since=<version> for deltas)")
     print("   - POST /api/upload-audio   (upload audio file)")
+    print("   - GET  /api/clusters/<id>  (expand a cluster)")
+    print("   - GET  /api/search         (search transcript segments)")
     print("   - POST /api/clear          (clear data)")
     print("\n⚠️  Server running on PORT 5000")
     print("   Make sure your frontend connects to http://localhost:5000\n")
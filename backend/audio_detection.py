@@ -1,12 +1,223 @@
+import os
+import subprocess
+import threading
+from functools import lru_cache
+
+import numpy as np
+import torch
 import whisper
+from whisper.audio import SAMPLE_RATE
+
+# Rough CPU seconds of compute per second of audio for float32 inference;
+# int8 dynamic quantization runs the Linear layers about twice as fast.
+CPU_REALTIME_FACTORS = {
+    "tiny": 0.04,
+    "base": 0.08,
+    "small": 0.25,
+    "medium": 0.7,
+}
+QUANTIZED_SPEEDUP = 1.8
+DEFAULT_MODEL_SIZE = "base"
+
+# Transcription should finish within this many seconds where possible
+LATENCY_BUDGET_SECONDS = float(os.getenv("WHISPER_LATENCY_BUDGET", "600"))
+# Largest model the duration policy may pick. Even int8, small (~0.14 RTF)
+# is slower than float32 base (0.08), so going above base is opt-in.
+MAX_MODEL_SIZE = os.getenv("WHISPER_MAX_MODEL", "base")
+# int8 dynamic quantization for CPU inference (ignored when CUDA is used)
+QUANTIZE_ON_CPU = os.getenv("WHISPER_QUANTIZE", "1") != "0"
+
+# Seconds of PCM decoded per window; peak memory is a few windows' worth
+WINDOW_SECONDS = 600
+# Audio longer than this is decoded window by window instead of in one go
+WINDOWED_MIN_SECONDS = 20 * 60
+# Cap on the audio carried over from an unfinished segment at a window edge
+MAX_CARRY_SECONDS = 30
+# Characters of the previous window's text passed as the next window's prompt
+CONTEXT_CHARS = 400
+
+
+def policy_model_sizes(max_size: str = MAX_MODEL_SIZE):
+    """Model sizes select_model_size may return, smallest first."""
+    sizes = list(CPU_REALTIME_FACTORS)
+    if max_size in sizes:
+        sizes = sizes[:sizes.index(max_size) + 1]
+    return sizes
+
+
+def select_model_size(duration, latency_budget: float = LATENCY_BUDGET_SECONDS,
+                      quantized: bool = False, max_size: str = MAX_MODEL_SIZE):
+    """
+    Pick the largest Whisper model expected to transcribe duration seconds
+    of audio within latency_budget seconds, falling back to the smallest.
+    """
+    if duration is None:
+        return DEFAULT_MODEL_SIZE
+
+    sizes = policy_model_sizes(max_size)
+    speedup = QUANTIZED_SPEEDUP if quantized else 1.0
+    for size in reversed(sizes):
+        if duration * CPU_REALTIME_FACTORS[size] / speedup <= latency_budget:
+            return size
+    return sizes[0]
+
+
+_model_lock = threading.Lock()
+
+
+def load_model(model_size: str = DEFAULT_MODEL_SIZE, quantized: bool = False):
+    """Load (and cache) a Whisper model, optionally int8-quantized for CPU."""
+    # Concurrent first requests would otherwise each load and quantize it
+    with _model_lock:
+        return _load_model(model_size, quantized)
+
+
+@lru_cache(maxsize=4)
+def _load_model(model_size, quantized):
+    if not quantized:
+        return whisper.load_model(model_size)
+
+    model = whisper.load_model(model_size, device="cpu")
+
+    # Whisper's Linear subclass only adds dtype casting; quantize_dynamic
+    # matches exact types, so present those layers as plain nn.Linear.
+    for module in model.modules():
+        if isinstance(module, whisper.model.Linear):
+            module.__class__ = torch.nn.Linear
+
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def probe_duration(path):
+    """Audio duration in seconds via ffprobe, or None if it can't be read."""
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1",
+        path
+    ]
+    try:
+        out = subprocess.run(cmd, capture_output=True, check=True, text=True).stdout
+        return float(out.strip())
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        return None
+
+
+def iter_pcm_windows(path, window_seconds: int = WINDOW_SECONDS):
+    """
+    Stream 16 kHz mono float32 PCM from ffmpeg in fixed-size windows.
 
-def audio_to_text(path, model_size="base"):
+    Memory is bounded by the window size, not the recording length. A
+    consumer that prefetches the next window while transcribing the current
+    one with carried-over audio prepended (as transcribe_windowed does)
+    holds about three windows, ~115 MB of float32 at the default 600 s.
+    """
+    cmd = [
+        "ffmpeg", "-nostdin", "-threads", "0",
+        "-i", path,
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le",
+        "-ar", str(SAMPLE_RATE),
+        "-"
+    ]
+    window_bytes = window_seconds * SAMPLE_RATE * 2
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+    try:
+        while True:
+            data = proc.stdout.read(window_bytes)
+            if not data:
+                break
+            yield np.frombuffer(data, np.int16).astype(np.float32) / 32768.0
+    finally:
+        proc.stdout.close()
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+
+    if proc.returncode not in (0, -9):
+        raise RuntimeError(f"ffmpeg failed to decode {path} (exit code {proc.returncode})")
+
+
+def transcribe_windowed(model, path, window_seconds: int = WINDOW_SECONDS, fp16: bool = True):
+    """
+    Transcribe a long recording window by window with bounded memory.
+
+    Context is carried across window boundaries in two ways: the tail of the
+    previous window's text is used as the initial prompt, and the audio of a
+    segment that was still in progress at the end of a window is prepended
+    to the next window rather than being transcribed cut in half.
+    """
+    segments = []
+    carry = np.zeros(0, dtype=np.float32)
+    window_start = 0.0  # seconds, position of carry[0] / window[0]
+    prompt = None
+
+    windows = iter_pcm_windows(path, window_seconds)
+    window = next(windows, None)
+
+    while window is not None:
+        audio = np.concatenate([carry, window]) if carry.size else window
+        next_window = next(windows, None)
+
+        result = model.transcribe(audio, initial_prompt=prompt, fp16=fp16)
+        window_segments = result["segments"]
+        audio_seconds = len(audio) / SAMPLE_RATE
+
+        carry = np.zeros(0, dtype=np.float32)
+        if next_window is not None and len(window_segments) > 1:
+            last = window_segments[-1]
+            if audio_seconds - last["start"] <= MAX_CARRY_SECONDS:
+                # Re-transcribe the unfinished last segment with the next window
+                window_segments = window_segments[:-1]
+                carry = audio[int(last["start"] * SAMPLE_RATE):]
+
+        for seg in window_segments:
+            segments.append({
+                "start": window_start + seg["start"],
+                "end": window_start + seg["end"],
+                "text": seg["text"]
+            })
+
+        text = " ".join(seg["text"].strip() for seg in window_segments)
+        if text:
+            prompt = text[-CONTEXT_CHARS:]
+
+        window_start += audio_seconds - len(carry) / SAMPLE_RATE
+        window = next_window
+
+    return {"segments": segments}
+
+
+def audio_to_text(path, model_size=None, windowed=None, quantized=None,
+                  latency_budget: float = LATENCY_BUDGET_SECONDS):
     """
     Audio file → structured transcript using Whisper
+
+    model_size=None picks the model from the audio duration and latency_budget.
+    quantized=None uses int8 CPU inference when no GPU is available.
+    windowed=None decodes in bounded-memory windows only when the recording
+    is longer than WINDOWED_MIN_SECONDS (or its length can't be determined).
     """
-    model = whisper.load_model(model_size)
+    on_cpu = not torch.cuda.is_available()
+    if quantized is None:
+        quantized = QUANTIZE_ON_CPU and on_cpu
+
+    duration = probe_duration(path)
+    if model_size is None:
+        model_size = select_model_size(duration, latency_budget, quantized=quantized)
+
+    print(f"Whisper model: {model_size}{' (int8)' if quantized else ''}, "
+          f"duration: {f'{duration:.0f}s' if duration else 'unknown'}")
+    model = load_model(model_size, quantized)
+    fp16 = not (on_cpu or quantized)
 
-    result = model.transcribe(path)
+    if windowed is None:
+        windowed = duration is None or duration > WINDOWED_MIN_SECONDS
+
+    if windowed:
+        result = transcribe_windowed(model, path, fp16=fp16)
+    else:
+        result = model.transcribe(path, fp16=fp16)
 
     segments = ""
     for seg in result["segments"]:
@@ -21,5 +232,3 @@ if __name__ == "__main__":
     )
 
     print(segments)
-
-
@@ -0,0 +1,118 @@
+"""
+Compare Whisper model sizes and int8 quantization on a sample recording.
+
+Reports load time, transcription time, real-time factor and word error rate
+against a reference transcript (a text file, or the largest float32 model's
+output when none is given).
+
+    python benchmark_whisper.py lecture.mp3 --sizes tiny,base,small --seconds 300
+"""
+
+import argparse
+import re
+import time
+
+import torch
+import whisper
+from whisper.audio import SAMPLE_RATE
+
+from audio_detection import CPU_REALTIME_FACTORS, load_model
+
+
+def normalize_words(text: str):
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """Word-level Levenshtein distance divided by the reference length."""
+    ref = normalize_words(reference)
+    hyp = normalize_words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+
+    prev = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        curr = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            curr[j] = min(
+                prev[j] + 1,
+                curr[j - 1] + 1,
+                prev[j - 1] + (r != h)
+            )
+        prev = curr
+    return prev[-1] / len(ref)
+
+
+def size_rank(model_size: str) -> int:
+    """Position by model size; sizes not in CPU_REALTIME_FACTORS (large) rank last."""
+    sizes = list(CPU_REALTIME_FACTORS)
+    base = model_size.split(".")[0]  # e.g. base.en
+    return sizes.index(base) if base in sizes else len(sizes)
+
+
+def run_case(audio, model_size: str, quantized: bool):
+    load_start = time.perf_counter()
+    model = load_model(model_size, quantized)
+    load_seconds = time.perf_counter() - load_start
+
+    start = time.perf_counter()
+    result = model.transcribe(audio, fp16=False)
+    seconds = time.perf_counter() - start
+
+    return {
+        "model": model_size,
+        "quantized": quantized,
+        "load_s": load_seconds,
+        "transcribe_s": seconds,
+        "text": result["text"]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("audio", help="Audio file to transcribe")
+    parser.add_argument("--sizes", default="tiny,base,small", help="Comma-separated model sizes")
+    parser.add_argument("--seconds", type=int, default=300, help="Benchmark only the first N seconds")
+    parser.add_argument("--reference", help="Reference transcript text file")
+    parser.add_argument("--threads", type=int, help="torch CPU threads")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    audio = whisper.load_audio(args.audio)[:args.seconds * SAMPLE_RATE]
+    audio_seconds = len(audio) / SAMPLE_RATE
+    sizes = [s.strip() for s in args.sizes.split(",") if s.strip()]
+
+    print(f"Benchmarking {audio_seconds:.0f}s of {args.audio} on {torch.get_num_threads()} threads")
+
+    results = []
+    for size in sizes:
+        for quantized in (False, True):
+            print(f"  {size}{' int8' if quantized else ''}...")
+            results.append(run_case(audio, size, quantized))
+
+    if args.reference:
+        with open(args.reference) as f:
+            reference = f.read()
+        reference_name = args.reference
+    else:
+        baseline = max((r for r in results if not r["quantized"]), key=lambda r: size_rank(r["model"]))
+        reference = baseline["text"]
+        reference_name = f"{baseline['model']} float32"
+
+    print(f"\nWER reference: {reference_name}")
+    print(f"{'model':<8} {'mode':<8} {'load s':>8} {'run s':>8} {'RTF':>6} {'speedup':>8} {'WER':>6}")
+
+    fp32_times = {r["model"]: r["transcribe_s"] for r in results if not r["quantized"]}
+    for r in results:
+        rtf = r["transcribe_s"] / audio_seconds
+        speedup = fp32_times[r["model"]] / r["transcribe_s"]
+        wer = word_error_rate(reference, r["text"])
+        mode = "int8" if r["quantized"] else "float32"
+        print(f"{r['model']:<8} {mode:<8} {r['load_s']:>8.1f} {r['transcribe_s']:>8.1f} "
+              f"{rtf:>6.3f} {speedup:>7.2f}x {wer:>6.1%}")
+
+
+if __name__ == "__main__":
+    main()
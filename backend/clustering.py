@@ -0,0 +1,171 @@
+# clustering.py - cluster hierarchy over the concept graph for lazy expansion
+
+import math
+from collections import deque
+
+ROOT_ID = "K0"
+
+
+class ClusterHierarchy:
+    """
+    Tree of concept clusters; every cluster has at most max_children children.
+
+    Clusters are grown around the most popular concepts (hubs) by breadth-first
+    search over the edges, so tightly linked concepts end up together, and are
+    capped in size so the tree stays about log(n) levels deep. Clients
+    start from the root's children and expand one cluster at a time; edges are
+    lifted onto whichever ancestor of each endpoint is currently visible.
+    """
+
+    def __init__(self, concepts, edges, max_children: int = 8):
+        self.max_children = max(2, max_children)
+        self.concepts = {c["id"]: c for c in concepts}
+        self.edges = edges
+        self.parent = {}
+        self.children = {}
+        self.members = {}
+
+        self.adjacency = {cid: set() for cid in self.concepts}
+        for e in edges:
+            a, b = e["from"], e["to"]
+            if a in self.adjacency and b in self.adjacency:
+                self.adjacency[a].add(b)
+                self.adjacency[b].add(a)
+
+        self._next_id = 1
+        self._build(ROOT_ID, list(self.concepts))
+
+    def _popularity(self, cid):
+        return (self.concepts[cid].get("popularity", 3), len(self.adjacency[cid]))
+
+    def _neighbours(self, cid):
+        # Sorted so every worker process builds the same tree (and cluster ids)
+        return sorted(self.adjacency[cid], key=lambda n: (self._popularity(n), n), reverse=True)
+
+    def _partition(self, ids):
+        """
+        Split ids into up to max_children groups of at most ceil(n / k) each.
+
+        Groups are seeded by the biggest hubs and grown by round-robin BFS, one
+        concept per group per turn, so a hub can't swallow the whole graph.
+        """
+        k = min(self.max_children, len(ids))
+        cap = math.ceil(len(ids) / k)
+        id_set = set(ids)
+        seeds = sorted(ids, key=self._popularity, reverse=True)[:k]
+
+        owner = {seed: i for i, seed in enumerate(seeds)}
+        groups = [[seed] for seed in seeds]
+        # Per group, neighbour iterators of its members in BFS order
+        frontiers = [deque([iter(self._neighbours(seed))]) for seed in seeds]
+
+        def claim(i):
+            frontier = frontiers[i]
+            while frontier:
+                for nbr in frontier[0]:
+                    if nbr in id_set and nbr not in owner:
+                        owner[nbr] = i
+                        groups[i].append(nbr)
+                        frontier.append(iter(self._neighbours(nbr)))
+                        return True
+                frontier.popleft()
+            return False
+
+        growing = True
+        while growing:
+            growing = False
+            for i in range(len(groups)):
+                if len(groups[i]) < cap and claim(i):
+                    growing = True
+
+        # Concepts no group could reach within its cap join the smallest group
+        for cid in ids:
+            if cid not in owner:
+                min(groups, key=len).append(cid)
+        return groups
+
+    def _build(self, cluster_id, ids):
+        self.members[cluster_id] = set(ids)
+
+        if len(ids) <= self.max_children:
+            self.children[cluster_id] = list(ids)
+            for cid in ids:
+                self.parent[cid] = cluster_id
+            return
+
+        child_ids = []
+        for group in self._partition(ids):
+            if len(group) == 1:
+                child = group[0]
+                self.parent[child] = cluster_id
+            else:
+                child = f"K{self._next_id}"
+                self._next_id += 1
+                self.parent[child] = cluster_id
+                self._build(child, group)
+            child_ids.append(child)
+        self.children[cluster_id] = child_ids
+
+    def is_cluster(self, node_id) -> bool:
+        return node_id in self.children
+
+    def node(self, node_id):
+        """Concept dict, or a summary node standing in for a cluster."""
+        if not self.is_cluster(node_id):
+            return self.concepts[node_id]
+
+        members = sorted(self.members[node_id], key=self._popularity, reverse=True)
+        lead = self.concepts[members[0]]
+        others = ", ".join(self.concepts[m]["label"] for m in members[1:4])
+        return {
+            "id": node_id,
+            "label": lead["label"],
+            "type": "cluster",
+            "description": f"{len(members)} concepts, including {others}" if others else lead.get("description", ""),
+            "popularity": lead.get("popularity", 3),
+            "size": len(members),
+            "is_cluster": True
+        }
+
+    def visible_ancestor(self, concept_id, visible):
+        node = concept_id
+        while node is not None and node not in visible:
+            node = self.parent.get(node)
+        return node
+
+    def lifted_edges(self, visible, touching=None):
+        """
+        Edges between visible nodes, each concept edge mapped onto the visible
+        ancestors of its endpoints. With touching, only edges with an end in it.
+        """
+        lifted = {}
+        for e in self.edges:
+            a = self.visible_ancestor(e["from"], visible)
+            b = self.visible_ancestor(e["to"], visible)
+            if a is None or b is None or a == b:
+                continue
+            if touching is not None and a not in touching and b not in touching:
+                continue
+            key = (a, b)
+            if key in lifted:
+                lifted[key]["weight"] += 1
+            else:
+                lifted[key] = {"from": a, "to": b, "relation": e["relation"], "weight": 1}
+        return list(lifted.values())
+
+    def top_level(self):
+        visible = set(self.children[ROOT_ID])
+        return {
+            "concepts": [self.node(n) for n in self.children[ROOT_ID]],
+            "edges": self.lifted_edges(visible)
+        }
+
+    def expand(self, cluster_id, visible):
+        """Children of cluster_id plus their edges to each other and to visible nodes."""
+        children = self.children[cluster_id]
+        visible = (set(visible) - {cluster_id}) | set(children)
+        return {
+            "cluster": cluster_id,
+            "concepts": [self.node(n) for n in children],
+            "edges": self.lifted_edges(visible, touching=set(children))
+        }
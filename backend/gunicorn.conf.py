@@ -0,0 +1,29 @@
+# gunicorn.conf.py - pre-fork production serving (gunicorn -c gunicorn.conf.py wsgi:app)
+
+import os
+
+bind = os.getenv("MINDMAP_BIND", "0.0.0.0:5000")
+
+# Load wsgi.py (models, agent clients) once in the master and fork workers from it
+preload_app = True
+workers = int(os.getenv("MINDMAP_WORKERS", "2"))
+
+# Threads let a worker answer polls while one of its threads runs an upload
+worker_class = "gthread"
+threads = int(os.getenv("MINDMAP_THREADS", "4"))
+
+# An upload runs the whole transcription + LLM pipeline in the request, and
+# a recycled worker is given as long to finish the uploads it is running
+timeout = int(os.getenv("MINDMAP_TIMEOUT", "1800"))
+graceful_timeout = int(os.getenv("MINDMAP_GRACEFUL_TIMEOUT", "1800"))
+
+# Recycle workers after a number of requests to bound memory growth;
+# jitter keeps them from all restarting at once
+max_requests = int(os.getenv("MINDMAP_MAX_REQUESTS", "200"))
+max_requests_jitter = max(1, max_requests // 10)
+
+
+def post_fork(server, worker):
+    # Split the CPU between workers instead of each using every core for torch
+    import torch
+    torch.set_num_threads(max(1, (os.cpu_count() or 1) // workers))
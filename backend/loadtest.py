@@ -0,0 +1,313 @@
+"""
+Concurrent load test for the Flask API.
+
+Runs the real app in-process on a local port with Whisper and the LLM agents
+replaced by stand-ins of tunable latency, so it needs no network or models.
+Mixed upload / poll / search traffic is driven at a fixed concurrency and
+throughput, latency percentiles and error rate are reported per route.
+
+    python loadtest.py --concurrency 10 --requests 200 --mix upload=1,poll=8,search=1
+    python loadtest.py --max-p95 5 --max-error-rate 0.01   # exit 1 if exceeded
+
+Pass --url to drive an already running server instead (no stand-ins).
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import math
+import os
+import random
+import struct
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# The agent modules build their LLM clients at import time
+os.environ.setdefault("OPENAI_API_KEY", "loadtest-offline")
+
+WORDS = (
+    "lecture theory evidence model argument history language structure "
+    "method system principle example network function process analysis"
+).split()
+RELATIONS = ["depends_on", "leads_to", "example_of", "derived_from"]
+
+
+# Stand-ins for the slow pipeline stages
+
+def make_stand_ins(whisper_latency: float, llm_latency: float, segments: int):
+    """Return replacements for the api module's Whisper and agent calls."""
+
+    def audio_to_text(path, *args, **kwargs):
+        time.sleep(whisper_latency)
+        rng = random.Random(path)
+        lines = []
+        for i in range(segments):
+            text = " ".join(rng.choice(WORDS) for _ in range(18)) + "."
+            lines.append(f"[{i * 5.0}–{i * 5.0 + 5.0}] {text} \n")
+        return "".join(lines)
+
+    def stream_objects(objects):
+        # Spread the call's latency across the streamed objects
+        delay = llm_latency / max(1, len(objects))
+        for obj in objects:
+            time.sleep(delay)
+            yield obj
+
+    def random_edges(concepts, count):
+        ids = [c["id"] for c in concepts]
+        if len(ids) < 2:
+            return []
+        return [
+            {"from": a, "to": b, "relation": random.choice(RELATIONS)}
+            for a, b in (random.sample(ids, 2) for _ in range(count))
+        ]
+
+    def iter_concepts(chunk, stream=True):
+        tag = uuid.uuid4().hex[:6]
+        concepts = [
+            {
+                "id": f"C{i + 1}",
+                "label": f"{random.choice(WORDS).title()} {tag}{i}",
+                "type": "theme",
+                "description": " ".join(random.sample(WORDS, 6)),
+                "popularity": random.randint(2, 5)
+            }
+            for i in range(5)
+        ]
+        return stream_objects(concepts)
+
+    def iter_dependencies(concepts, lecture_text, focus="thematic", stream=True):
+        return stream_objects(random_edges(concepts, len(concepts)))
+
+    def iter_conceptual_dependencies(concepts, stream=True):
+        return stream_objects(random_edges(concepts, len(concepts) // 2))
+
+    def ensure_full_connectivity(concepts, existing_edges, stream=True):
+        connected = {e["from"] for e in existing_edges} | {e["to"] for e in existing_edges}
+        isolated = [c for c in concepts if c["id"] not in connected]
+        if not isolated:
+            return []
+        return list(stream_objects([
+            {"from": c["id"], "to": concepts[0]["id"], "relation": "leads_to"}
+            for c in isolated if c["id"] != concepts[0]["id"]
+        ]))
+
+    return {
+        "audio_to_text": audio_to_text,
+        "iter_concepts": iter_concepts,
+        "iter_dependencies": iter_dependencies,
+        "iter_conceptual_dependencies": iter_conceptual_dependencies,
+        "ensure_full_connectivity": ensure_full_connectivity,
+    }
+
+
+def start_local_server(stand_ins, workdir, quiet: bool = True):
+    """
+    Serve the real app with stand-ins patched in; returns (base_url, server).
+
+    Uploads and shared state go to workdir, never the app's own folders, so
+    running this on a server doesn't fill or evict its real upload store.
+    """
+    from werkzeug.serving import make_server
+    import api
+    from upload_store import UploadStore
+
+    if quiet:
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    for name, fn in stand_ins.items():
+        setattr(api, name, fn)
+
+    api.upload_store = UploadStore(os.path.join(workdir, "uploads"), max_bytes=api.upload_store.max_bytes)
+    if api.shared_state is not None:
+        from shared_state import SharedGraphState
+        api.shared_state = SharedGraphState(os.path.join(workdir, "state"), max_graphs=api.shared_state.max_graphs)
+
+    server = make_server("127.0.0.1", 0, api.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server
+
+
+# Request generators
+
+def noise_wav(seconds: float = 1.0, rate: int = 8000) -> bytes:
+    """A small WAV file; random noise keeps every upload's content distinct."""
+    frames = bytes(random.getrandbits(8) for _ in range(int(seconds * rate) * 2))
+    header = b"RIFF" + struct.pack("<I", 36 + len(frames)) + b"WAVE"
+    header += b"fmt " + struct.pack("<IHHIIHH", 16, 1, 1, rate, rate * 2, 2, 16)
+    header += b"data" + struct.pack("<I", len(frames))
+    return header + frames
+
+
+def upload_request(base_url):
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="audio"; filename="load-{boundary[:8]}.wav"\r\n'
+        f"Content-Type: audio/wav\r\n\r\n"
+    ).encode() + noise_wav() + f"\r\n--{boundary}--\r\n".encode()
+    return urllib.request.Request(
+        f"{base_url}/api/upload-audio",
+        data=body,
+        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+        method="POST"
+    )
+
+
+def poll_request(base_url):
+    return urllib.request.Request(
+        f"{base_url}/api/mindmap-data",
+        headers={"Accept-Encoding": "gzip"}
+    )
+
+
+def search_request(base_url):
+    query = " ".join(random.sample(WORDS, 2))
+    return urllib.request.Request(
+        f"{base_url}/api/search?q={urllib.parse.quote(query)}",
+        headers={"Accept-Encoding": "gzip"}
+    )
+
+
+REQUEST_TYPES = {
+    "upload": upload_request,
+    "poll": poll_request,
+    "search": search_request,
+}
+
+
+def timed_request(kind, base_url, timeout):
+    req = REQUEST_TYPES[kind](base_url)
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            resp.read()
+            ok = 200 <= resp.status < 300
+    except (urllib.error.URLError, OSError):
+        ok = False
+    return kind, time.perf_counter() - start, ok
+
+
+# Reporting
+
+def percentile(sorted_values, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct * len(sorted_values) / 100))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(results, wall_seconds):
+    groups = {"all": results}
+    for kind in REQUEST_TYPES:
+        subset = [r for r in results if r[0] == kind]
+        if subset:
+            groups[kind] = subset
+
+    summary = {}
+    for name, group in groups.items():
+        latencies = sorted(r[1] for r in group)
+        errors = sum(1 for r in group if not r[2])
+        summary[name] = {
+            "requests": len(group),
+            "throughput_rps": len(group) / wall_seconds if wall_seconds else 0.0,
+            "p50_s": percentile(latencies, 50),
+            "p95_s": percentile(latencies, 95),
+            "p99_s": percentile(latencies, 99),
+            "error_rate": errors / len(group)
+        }
+    return summary
+
+
+def print_summary(summary, wall_seconds):
+    print(f"\nCompleted in {wall_seconds:.1f}s")
+    print(f"{'route':<8} {'reqs':>6} {'req/s':>8} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8} {'errors':>7}")
+    for name, s in summary.items():
+        print(f"{name:<8} {s['requests']:>6} {s['throughput_rps']:>8.2f} {s['p50_s']:>8.3f} "
+              f"{s['p95_s']:>8.3f} {s['p99_s']:>8.3f} {s['error_rate']:>7.1%}")
+
+
+def parse_mix(text: str):
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in REQUEST_TYPES:
+            raise argparse.ArgumentTypeError(f"Unknown request type: {kind}")
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="Target a running server instead of an in-process one")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=100, help="Total requests to send")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("upload=1,poll=8,search=1"),
+                        help="Weighted request mix, e.g. upload=1,poll=8,search=1")
+    parser.add_argument("--whisper-latency", type=float, default=2.0, help="Stand-in transcription seconds")
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="Stand-in seconds per LLM call")
+    parser.add_argument("--segments", type=int, default=400, help="Stand-in transcript segments")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Keep the server's pipeline logs")
+    parser.add_argument("--max-error-rate", type=float, help="Fail if the overall error rate exceeds this")
+    parser.add_argument("--max-p95", type=float, help="Fail if overall p95 latency (s) exceeds this")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    server = workdir = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        stand_ins = make_stand_ins(args.whisper_latency, args.llm_latency, args.segments)
+        workdir = tempfile.TemporaryDirectory(prefix="mindmap-loadtest-")
+        base_url, server = start_local_server(stand_ins, workdir.name, quiet=not args.verbose)
+
+    kinds = list(args.mix)
+    plan = random.choices(kinds, weights=[args.mix[k] for k in kinds], k=args.requests)
+    print(f"Sending {len(plan)} requests to {base_url} with concurrency {args.concurrency}")
+
+    logs = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    start = time.perf_counter()
+    with logs, ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(lambda kind: timed_request(kind, base_url, args.timeout), plan))
+    wall_seconds = time.perf_counter() - start
+
+    if server is not None:
+        server.shutdown()
+        workdir.cleanup()
+
+    summary = summarize(results, wall_seconds)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_summary(summary, wall_seconds)
+
+    failed = []
+    overall = summary["all"]
+    if args.max_error_rate is not None and overall["error_rate"] > args.max_error_rate:
+        failed.append(f"error rate {overall['error_rate']:.1%} > {args.max_error_rate:.1%}")
+    if args.max_p95 is not None and overall["p95_s"] > args.max_p95:
+        failed.append(f"p95 {overall['p95_s']:.3f}s > {args.max_p95:.3f}s")
+
+    if failed:
+        print(f"\n❌ Load test failed: {'; '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ from agents.dependency_agent import (
     ensure_full_connectivity
 )
 from agents.validator_agent import validate_edges
+from scheduler import Stage, run_stages
 
 
 def chunk_text(text: str, chunk_size: int = 3000, overlap: int = 500):
@@ -96,33 +97,35 @@ def build_lecture_graph(audio_path: str):
 
     # IMPROVED: Multi-pass edge extraction with popularity awareness
     print("\n[5] Extracting dependencies (popularity-aware)...")
-    all_edges = []
-    
-    # Pass 1: Thematic relationships
-    print("  Pass 1: Thematic relationships...")
-    thematic_edges = extract_dependencies(
-        concepts, 
-        lecture_text[:8000],
-        focus="thematic"
-    )
-    all_edges.extend(thematic_edges)
-    print(f"    Found {len(thematic_edges)} thematic edges")
-    
-    # Pass 2: Concept-to-concept relationships
-    print("  Pass 2: Concept interdependencies...")
-    concept_edges = extract_conceptual_dependencies(concepts)
-    all_edges.extend(concept_edges)
-    print(f"    Found {len(concept_edges)} conceptual edges")
-    
-    # Validate intermediate edges
-    print("  Validating intermediate edges...")
-    validated_edges = validate_edges(all_edges, concepts)
-    print(f"    Valid edges after initial passes: {len(validated_edges)}")
-    
-    # Pass 3: Ensure full connectivity
-    print("  Pass 3: Ensuring all concepts are connected...")
-    connectivity_edges = ensure_full_connectivity(concepts, validated_edges)
-    all_edges.extend(connectivity_edges)
+
+    # Passes 1 and 2 only need the concept list, so they run concurrently
+    def thematic_pass():
+        edges = extract_dependencies(concepts, lecture_text[:8000], focus="thematic")
+        print(f"    Pass 1 (thematic): {len(edges)} edges")
+        return edges
+
+    def conceptual_pass():
+        edges = extract_conceptual_dependencies(concepts)
+        print(f"    Pass 2 (conceptual): {len(edges)} edges")
+        return edges
+
+    def merge_passes(thematic_edges, concept_edges):
+        edges = validate_edges(thematic_edges + concept_edges, concepts)
+        print(f"    Valid edges after initial passes: {len(edges)}")
+        return edges
+
+    def connectivity_pass(validated_edges):
+        print("  Pass 3: Ensuring all concepts are connected...")
+        return ensure_full_connectivity(concepts, validated_edges)
+
+    print("  Passes 1+2: Thematic and conceptual relationships (concurrent)...")
+    results = run_stages([
+        Stage("thematic", thematic_pass),
+        Stage("conceptual", conceptual_pass),
+        Stage("merged", merge_passes, deps=("thematic", "conceptual")),
+        Stage("connectivity", connectivity_pass, deps=("merged",)),
+    ])
+    all_edges = results["thematic"] + results["conceptual"] + results["connectivity"]
     
     print(f"  Total raw edges: {len(all_edges)}")
 
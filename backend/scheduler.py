@@ -0,0 +1,73 @@
+# scheduler.py - run independent pipeline stages concurrently
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# fn is called with the results of its deps, in the order they are listed
+Stage = namedtuple("Stage", ["name", "fn", "deps"], defaults=[()])
+
+
+def check_stages(stages):
+    """Raise ValueError for duplicate names, unknown dependencies or cycles."""
+    by_name = {}
+    for stage in stages:
+        if stage.name in by_name:
+            raise ValueError(f"Duplicate stage name: {stage.name}")
+        by_name[stage.name] = stage
+
+    for stage in stages:
+        for dep in stage.deps:
+            if dep not in by_name:
+                raise ValueError(f"Stage {stage.name} depends on unknown stage {dep}")
+
+    visiting, visited = set(), set()
+
+    def visit(name):
+        if name in visited:
+            return
+        if name in visiting:
+            raise ValueError(f"Dependency cycle through stage {name}")
+        visiting.add(name)
+        for dep in by_name[name].deps:
+            visit(dep)
+        visiting.discard(name)
+        visited.add(name)
+
+    for stage in stages:
+        visit(stage.name)
+
+
+def run_stages(stages, max_workers: int = 4):
+    """
+    Run a DAG of stages, starting each one as soon as its dependencies finish.
+
+    Stages without a data dependency on each other (e.g. two LLM passes over
+    the same concept list) run concurrently on a thread pool. Returns a dict
+    mapping stage name to result. The first failure cancels stages that have
+    not started yet and is re-raised.
+    """
+    check_stages(stages)
+
+    results = {}
+    remaining = list(stages)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while remaining or running:
+            ready = [s for s in remaining if all(d in results for d in s.deps)]
+            for stage in ready:
+                remaining.remove(stage)
+                args = [results[d] for d in stage.deps]
+                running[pool.submit(stage.fn, *args)] = stage.name
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                error = future.exception()
+                if error is not None:
+                    for pending in running:
+                        pending.cancel()
+                    raise error
+                results[name] = future.result()
+
+    return results
@@ -0,0 +1,191 @@
+# search_index.py - inverted index over transcript segments
+
+import heapq
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+
+# Matches the "[start–end] text" lines produced by audio_to_text
+SEGMENT_PATTERN = re.compile(r"^\[(\d+(?:\.\d+)?)\s*[–-]\s*(\d+(?:\.\d+)?)\]\s*(.*)$")
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have he her his i if in into is it its
+me my not of on or our she so that the their them then there these they this to
+was we were what when which who will with you your um uh like just
+""".split())
+
+
+def tokenize(text: str):
+    """Lowercase word tokens with stopwords removed."""
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def parse_transcript(text: str):
+    """Split a timestamped transcript into segments with millisecond bounds."""
+    segments = []
+    for line in text.splitlines():
+        match = SEGMENT_PATTERN.match(line.strip())
+        if not match:
+            continue
+        start, end, body = match.groups()
+        if not body.strip():
+            continue
+        segments.append({
+            "start_ms": int(round(float(start) * 1000)),
+            "end_ms": int(round(float(end) * 1000)),
+            "text": body.strip()
+        })
+    return segments
+
+
+class TranscriptIndex:
+    """BM25-ranked inverted index over the segments of one lecture."""
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, segments):
+        self.segments = segments
+        self.postings = {}
+        lengths = []
+
+        for seg_id, seg in enumerate(segments):
+            counts = Counter(tokenize(seg["text"]))
+            lengths.append(sum(counts.values()))
+            for token, tf in counts.items():
+                self.postings.setdefault(token, []).append((seg_id, tf))
+
+        n = len(segments)
+        avg_length = (sum(lengths) / n) if n else 0.0
+
+        # Precompute the per-segment length normalisation so queries only add
+        self._norms = [
+            self.K1 * (1 - self.B + self.B * (length / avg_length if avg_length else 0))
+            for length in lengths
+        ]
+        self.idf = {
+            token: math.log(1 + (n - len(posts) + 0.5) / (len(posts) + 0.5))
+            for token, posts in self.postings.items()
+        }
+
+        self.concept_segments = {}
+        self.segment_concepts = {}
+        self.concept_labels = {}
+
+    @classmethod
+    def from_transcript(cls, text: str):
+        return cls(parse_transcript(text))
+
+    def _score(self, tokens, weights=None):
+        scores = {}
+        for token in tokens:
+            posts = self.postings.get(token)
+            if not posts:
+                continue
+            idf = self.idf[token] * (weights.get(token, 1.0) if weights else 1.0)
+            for seg_id, tf in posts:
+                bm25 = idf * tf * (self.K1 + 1) / (tf + self._norms[seg_id])
+                scores[seg_id] = scores.get(seg_id, 0.0) + bm25
+        return scores
+
+    def link_concepts(self, concepts, per_concept: int = 5):
+        """Attach each concept to the segments that best support it."""
+        self.concept_segments = {}
+        self.segment_concepts = {}
+        self.concept_labels = {}
+
+        for c in concepts:
+            label_tokens = tokenize(c.get("label", ""))
+            # Label words count double relative to words from the description
+            weights = {t: 2.0 for t in label_tokens}
+            tokens = set(label_tokens) | set(tokenize(c.get("description", "")))
+            scores = self._score(tokens, weights)
+            top = heapq.nlargest(per_concept, scores.items(), key=lambda kv: kv[1])
+
+            seg_ids = sorted(seg_id for seg_id, _ in top)
+            self.concept_segments[c["id"]] = seg_ids
+            self.concept_labels[c["id"]] = set(label_tokens)
+            for seg_id in seg_ids:
+                self.segment_concepts.setdefault(seg_id, []).append(c["id"])
+
+    def search(self, query: str, limit: int = 10):
+        """Return (score, segment_id) pairs for the best matching segments."""
+        tokens = set(tokenize(query))
+        if not tokens:
+            return []
+
+        scores = self._score(tokens)
+
+        # Segments linked to a concept named in the query get a boost
+        for concept_id, label_tokens in self.concept_labels.items():
+            if label_tokens and label_tokens <= tokens:
+                for seg_id in self.concept_segments.get(concept_id, []):
+                    scores[seg_id] = scores.get(seg_id, 0.0) * 1.5 + 1.0
+
+        top = heapq.nlargest(limit, scores.items(), key=lambda kv: kv[1])
+        return [(score, seg_id) for seg_id, score in top]
+
+    def segment_result(self, seg_id: int, score=None):
+        seg = self.segments[seg_id]
+        result = {
+            "segment_id": seg_id,
+            "start_ms": seg["start_ms"],
+            "end_ms": seg["end_ms"],
+            "text": seg["text"],
+            "concepts": self.segment_concepts.get(seg_id, [])
+        }
+        if score is not None:
+            result["score"] = round(score, 4)
+        return result
+
+
+class IndexRegistry:
+    """
+    Keeps the search indexes of the most recently built graphs.
+
+    Shared by request threads, so the registry itself is guarded by a lock;
+    searches run on a snapshot and never look an index up again afterwards.
+    """
+
+    def __init__(self, max_graphs: int = 32):
+        self.max_graphs = max_graphs
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, graph_id: str, index: TranscriptIndex):
+        with self._lock:
+            self._indexes[graph_id] = index
+            self._indexes.move_to_end(graph_id)
+            while len(self._indexes) > self.max_graphs:
+                self._indexes.popitem(last=False)
+
+    def get(self, graph_id: str):
+        with self._lock:
+            return self._indexes.get(graph_id)
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+
+    def search(self, query: str, limit: int = 10, graph_id=None):
+        """Rank segments across one graph, or all stored graphs if none is given."""
+        if graph_id is not None:
+            index = self.get(graph_id)
+            targets = [(graph_id, index)] if index else []
+        else:
+            with self._lock:
+                targets = list(self._indexes.items())
+
+        hits = []
+        for gid, index in targets:
+            for score, seg_id in index.search(query, limit):
+                hits.append((score, gid, index, seg_id))
+
+        results = []
+        for score, gid, index, seg_id in heapq.nlargest(limit, hits, key=lambda h: h[0]):
+            result = index.segment_result(seg_id, score)
+            result["graph_id"] = gid
+            results.append(result)
+        return results
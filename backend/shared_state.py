@@ -0,0 +1,117 @@
+# shared_state.py - current graph shared between pre-forked worker processes
+
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    raise ImportError("MINDMAP_STATE_DIR (multi-process serving) needs fcntl, "
+                      "which is only available on Linux/macOS") from None
+
+
+class SharedGraphState:
+    """
+    Disk-backed copy of the current graph so every worker serves the same map.
+
+    publish() writes the graph atomically with a version number allocated
+    under a file lock; other workers notice the change with a single stat()
+    in load_if_changed(). Transcripts of the max_graphs most recent graphs
+    are kept so any worker can rebuild the search index for a graph another
+    worker produced.
+    """
+
+    def __init__(self, state_dir, max_graphs: int = 32):
+        self.state_dir = Path(state_dir)
+        self.graphs_dir = self.state_dir / "graphs"
+        self.graphs_dir.mkdir(parents=True, exist_ok=True)
+        self.current_path = self.state_dir / "current_graph.json"
+        self.lock_path = self.state_dir / ".lock"
+        self.max_graphs = max_graphs
+        self._seen = None
+
+    @contextmanager
+    def _locked(self):
+        with open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write_json(self, path: Path, payload):
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(payload, f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def _read_current(self):
+        try:
+            with open(self.current_path) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def publish(self, graph) -> int:
+        """Store graph as the current one and return its new version."""
+        with self._locked():
+            current = self._read_current()
+            version = (current["version"] if current else 0) + 1
+            self._write_json(self.current_path, {"version": version, "graph": graph})
+            self._seen = self._stamp()
+        return version
+
+    def _stamp(self):
+        # os.replace gives every publish a new inode, so this changes even
+        # when two publishes land within one tick of the mtime clock
+        st = self.current_path.stat()
+        return st.st_ino, st.st_mtime_ns
+
+    def load_if_changed(self):
+        """Return (graph, version) if another process published since last check."""
+        try:
+            stamp = self._stamp()
+        except FileNotFoundError:
+            return None
+        if stamp == self._seen:
+            return None
+
+        current = self._read_current()
+        if current is None:
+            return None
+        self._seen = stamp
+        return current["graph"], current["version"]
+
+    def save_transcript(self, graph_id: str, transcript: str, concepts):
+        self._write_json(self.graphs_dir / f"{graph_id}.json", {
+            "transcript": transcript,
+            "concepts": concepts
+        })
+        for path in self._stored_graphs()[self.max_graphs:]:
+            path.unlink(missing_ok=True)
+
+    def load_transcript(self, graph_id: str):
+        """Return (transcript, concepts) for graph_id, or None if unknown."""
+        path = self.graphs_dir / f"{Path(graph_id).name}.json"
+        try:
+            with open(path) as f:
+                stored = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        return stored["transcript"], stored["concepts"]
+
+    def _stored_graphs(self):
+        """Stored transcript files, newest first."""
+        stored = []
+        for path in self.graphs_dir.glob("*.json"):
+            try:
+                stored.append((path.stat().st_mtime_ns, path))
+            except FileNotFoundError:  # pruned by another worker
+                continue
+        stored.sort(reverse=True)
+        return [path for _, path in stored]
+
+    def recent_graph_ids(self, limit: int):
+        return [p.stem for p in self._stored_graphs()[:limit]]
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import backend modules the same way api.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,81 @@
+# test_clustering.py - ClusterHierarchy partitioning and expansion
+
+import math
+
+from clustering import ClusterHierarchy, ROOT_ID
+
+
+def concepts(n, hub=None):
+    return [
+        {"id": f"C{i}", "label": f"Concept {i}", "popularity": 5 if i == hub else 3}
+        for i in range(n)
+    ]
+
+
+def edge(a, b):
+    return {"from": f"C{a}", "to": f"C{b}", "relation": "depends_on"}
+
+
+def depth(tree, node=ROOT_ID):
+    if not tree.is_cluster(node):
+        return 0
+    return 1 + max(depth(tree, child) for child in tree.children[node])
+
+
+def leaves(tree, node=ROOT_ID):
+    if not tree.is_cluster(node):
+        return [node]
+    return [leaf for child in tree.children[node] for leaf in leaves(tree, child)]
+
+
+def check_shape(tree, n, max_children=8):
+    assert sorted(leaves(tree)) == sorted(f"C{i}" for i in range(n))
+    assert all(len(children) <= max_children for children in tree.children.values())
+    assert depth(tree) <= math.ceil(math.log(n, max_children)) + 1
+
+    top = tree.children[ROOT_ID]
+    cap = math.ceil(n / max_children)
+    assert len(top) == min(max_children, n)
+    assert all(len(tree.members.get(c, [c])) <= cap for c in top)
+
+
+def test_star_is_split_evenly():
+    n = 200
+    tree = ClusterHierarchy(concepts(n, hub=0), [edge(0, i) for i in range(1, n)])
+    check_shape(tree, n)
+
+
+def test_chain_is_split_evenly():
+    n = 200
+    tree = ClusterHierarchy(concepts(n), [edge(i, i + 1) for i in range(n - 1)])
+    check_shape(tree, n)
+
+
+def test_edgeless_graph_uses_every_top_level_slot():
+    tree = ClusterHierarchy(concepts(15), [])
+    check_shape(tree, 15)
+
+
+def test_small_graph_is_flat():
+    tree = ClusterHierarchy(concepts(5), [edge(0, 1)])
+    assert tree.children[ROOT_ID] == [f"C{i}" for i in range(5)]
+
+
+def test_build_is_deterministic():
+    edges = [edge(0, i) for i in range(1, 60)] + [edge(i, i + 1) for i in range(1, 59)]
+    first = ClusterHierarchy(concepts(60, hub=0), edges)
+    second = ClusterHierarchy(concepts(60, hub=0), list(reversed(edges)))
+    assert first.children == second.children
+
+
+def test_expand_lifts_edges_onto_visible_nodes():
+    n = 100
+    tree = ClusterHierarchy(concepts(n, hub=0), [edge(0, i) for i in range(1, n)])
+    top = tree.top_level()
+    visible = [c["id"] for c in top["concepts"]]
+
+    cluster = next(c["id"] for c in top["concepts"] if c.get("is_cluster"))
+    result = tree.expand(cluster, visible)
+    shown = set(visible) - {cluster} | {c["id"] for c in result["concepts"]}
+    assert result["concepts"]
+    assert all(e["from"] in shown and e["to"] in shown for e in result["edges"])
@@ -0,0 +1,18 @@
+# test_loadtest.py - load test reporting
+
+from loadtest import percentile
+
+
+def test_percentile_is_nearest_rank():
+    thirty = list(range(1, 31))
+    assert percentile(thirty, 95) == 29
+    assert percentile(thirty, 50) == 15
+    assert percentile([1, 2, 3, 4, 5], 50) == 3
+    assert percentile(list(range(1, 101)), 99) == 99
+
+
+def test_percentile_edges():
+    assert percentile([], 95) == 0.0
+    assert percentile([7], 50) == 7
+    assert percentile([1, 2, 3], 0) == 1
+    assert percentile([1, 2, 3], 100) == 3
@@ -0,0 +1,62 @@
+# test_scheduler.py - run_stages DAG execution
+
+import threading
+import time
+
+import pytest
+
+from scheduler import Stage, check_stages, run_stages
+
+
+def test_results_flow_along_dependencies():
+    results = run_stages([
+        Stage("a", lambda: 2),
+        Stage("b", lambda: 3),
+        Stage("sum", lambda a, b: a + b, deps=("a", "b")),
+        Stage("double", lambda s: s * 2, deps=("sum",)),
+    ])
+    assert results == {"a": 2, "b": 3, "sum": 5, "double": 10}
+
+
+def test_independent_stages_run_concurrently():
+    barrier = threading.Barrier(2, timeout=5)
+    # Each stage waits for the other, so this only finishes if both run at once
+    results = run_stages([
+        Stage("a", lambda: barrier.wait() is not None),
+        Stage("b", lambda: barrier.wait() is not None),
+    ])
+    assert results == {"a": True, "b": True}
+
+
+def test_cycles_are_rejected():
+    with pytest.raises(ValueError, match="cycle"):
+        run_stages([
+            Stage("a", lambda b: b, deps=("b",)),
+            Stage("b", lambda a: a, deps=("a",)),
+        ])
+
+
+def test_unknown_and_duplicate_stages_are_rejected():
+    with pytest.raises(ValueError, match="unknown"):
+        check_stages([Stage("a", lambda x: x, deps=("missing",))])
+    with pytest.raises(ValueError, match="Duplicate"):
+        check_stages([Stage("a", lambda: 1), Stage("a", lambda: 2)])
+
+
+def test_first_failure_propagates_and_skips_dependents():
+    ran = []
+
+    def fail():
+        raise RuntimeError("pass 1 failed")
+
+    def slow():
+        time.sleep(0.2)
+        raise KeyError("later failure")
+
+    with pytest.raises(RuntimeError, match="pass 1 failed"):
+        run_stages([
+            Stage("fail", fail),
+            Stage("slow", slow),
+            Stage("after", lambda a: ran.append(a), deps=("fail",)),
+        ])
+    assert ran == []
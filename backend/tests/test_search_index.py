@@ -0,0 +1,40 @@
+# test_search_index.py - TranscriptIndex and IndexRegistry
+
+from search_index import IndexRegistry, TranscriptIndex
+
+TRANSCRIPT = """[0.0–4.0] Natural selection acts on variation within a population.
+[4.0–9.5] Mutations are the ultimate source of genetic variation.
+[9.5–15.0] Genetic drift changes allele frequencies by chance."""
+
+
+def test_parse_and_search():
+    index = TranscriptIndex.from_transcript(TRANSCRIPT)
+    assert len(index.segments) == 3
+    assert index.segments[1]["start_ms"] == 4000
+
+    score, seg_id = index.search("genetic drift")[0]
+    assert seg_id == 2 and score > 0
+
+
+def test_registry_keeps_most_recent():
+    registry = IndexRegistry(max_graphs=2)
+    for gid in ("g1", "g2", "g3"):
+        registry.add(gid, TranscriptIndex.from_transcript(TRANSCRIPT))
+    assert registry.get("g1") is None
+    assert registry.get("g3") is not None
+
+
+def test_search_survives_eviction_during_scoring():
+    registry = IndexRegistry(max_graphs=1)
+
+    class EvictingIndex(TranscriptIndex):
+        def search(self, query, limit=10):
+            hits = super().search(query, limit)
+            # Another request thread adding a graph evicts this one
+            registry.add("other", TranscriptIndex.from_transcript(TRANSCRIPT))
+            return hits
+
+    registry.add("g1", EvictingIndex.from_transcript(TRANSCRIPT))
+    results = registry.search("mutations")
+    assert results and results[0]["graph_id"] == "g1"
+    assert registry.get("g1") is None
@@ -0,0 +1,93 @@
+# test_streaming.py - IncrementalJSONArrayParser
+
+import json
+
+from agents.streaming import IncrementalJSONArrayParser
+
+
+def feed_all(chunks):
+    parser = IncrementalJSONArrayParser()
+    items = []
+    for chunk in chunks:
+        items.extend(parser.feed(chunk))
+    return parser, items
+
+
+def test_whole_array_in_one_chunk():
+    parser, items = feed_all(['[{"id": "C1"}, {"id": "C2"}]'])
+    assert items == [{"id": "C1"}, {"id": "C2"}]
+    assert parser.done and not parser.truncated
+    assert parser.count == 2
+
+
+def test_every_chunk_boundary():
+    text = '```json\n[{"id": "C1", "tags": ["a", "b"]}, {"id": "C2", "n": {"x": 1}}]\n```'
+    expected = json.loads(text[8:-4])
+    for cut in range(len(text) + 1):
+        _, items = feed_all([text[:cut], text[cut:]])
+        assert items == expected, cut
+
+
+def test_single_character_chunks():
+    text = '[{"a": 1}, {"b": [1, 2, {"c": 3}]}]'
+    _, items = feed_all(list(text))
+    assert items == [{"a": 1}, {"b": [1, 2, {"c": 3}]}]
+
+
+def test_brackets_and_escapes_inside_strings():
+    elements = [
+        {"label": "set {A, B}"},
+        {"label": "array [0]"},
+        {"label": 'say \"hi\"'},
+        {"label": "back\\slash\\"},
+        {"label": "}]"},
+    ]
+    _, items = feed_all([json.dumps(elements)])
+    assert items == elements
+
+
+def test_escaped_quote_split_across_chunks():
+    _, items = feed_all(['[{"label": "a\\', '"b"}]'])
+    assert items == [{"label": 'a"b'}]
+
+
+def test_non_object_elements_are_skipped():
+    text = '[{"a": 1}, "str{", 42, null, ["x", {"y": 2}], "]", {"b": 2}]'
+    parser, items = feed_all([text])
+    assert items == [{"a": 1}, {"b": 2}]
+    assert parser.done and parser.errors == 0
+
+
+def test_brace_in_top_level_string():
+    parser, items = feed_all(['[{"a":1}, "str{", {"b":2}]'])
+    assert items == [{"a": 1}, {"b": 2}]
+    assert parser.done
+
+
+def test_truncated_stream_keeps_completed_objects():
+    parser, items = feed_all(['[{"a": 1}, {"b": 2}, {"c": '])
+    assert items == [{"a": 1}, {"b": 2}]
+    assert parser.truncated
+
+
+def test_text_before_array_is_ignored():
+    parser, items = feed_all(['Here you go: ', '[{"a": 1}]'])
+    assert items == [{"a": 1}]
+    assert not parser.truncated
+
+
+def test_no_array():
+    parser, items = feed_all(["I could not find any concepts."])
+    assert items == []
+    assert not parser.started
+
+
+def test_invalid_object_counts_as_error():
+    parser, items = feed_all(['[{"a": 1,}, {"b": 2}]'])
+    assert items == [{"b": 2}]
+    assert parser.errors == 1
+
+
+def test_input_after_closing_bracket_is_ignored():
+    _, items = feed_all(['[{"a": 1}] trailing {"b": 2}'])
+    assert items == [{"a": 1}]
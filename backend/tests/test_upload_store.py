@@ -0,0 +1,137 @@
+# test_upload_store.py - content-addressed uploads and flock-protected eviction
+
+import fcntl
+import io
+import os
+import threading
+import time
+
+import pytest
+
+import upload_store
+from upload_store import UploadStore
+
+
+class Upload:
+    """Just enough of werkzeug's FileStorage for UploadStore.save()."""
+
+    def __init__(self, data: bytes):
+        self.stream = io.BytesIO(data)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return UploadStore(tmp_path, max_bytes=0)
+
+
+def stored_files(store):
+    return sorted(p.name for p in store.root.iterdir())
+
+
+def test_save_stores_by_content_and_dedups(store):
+    with store.save(Upload(b"lecture"), "MP3") as (path, sha, is_new):
+        assert is_new and path.name == f"{sha}.mp3"
+        assert path.read_bytes() == b"lecture"
+    with store.save(Upload(b"lecture"), "mp3") as (again, sha2, is_new):
+        assert not is_new and again == path and sha2 == sha
+    assert stored_files(store) == [path.name]  # no .part files left behind
+
+
+def test_files_being_processed_are_not_evicted(store):
+    with store.save(Upload(b"a" * 100), "wav") as (path, _, _):
+        assert store.evict() == 0
+        assert path.exists()
+    assert store.evict() == 100
+    assert stored_files(store) == []
+
+
+def test_evicts_least_recently_used_first(tmp_path):
+    store = UploadStore(tmp_path, max_bytes=150)
+    paths = []
+    for i, data in enumerate((b"a" * 100, b"b" * 100)):
+        with store.save(Upload(data), "wav") as (path, _, _):
+            paths.append(path)
+        os.utime(path, (1000 + i, 1000 + i))
+
+    store.evict()
+    assert not paths[0].exists() and paths[1].exists()
+
+
+def test_concurrent_link_race_reuses_the_winners_copy(store, monkeypatch):
+    with store.save(Upload(b"same"), "mp3") as (first, _, _):
+        inode = first.stat().st_ino
+
+        # Pretend the copy wasn't there yet when checked, as if another upload
+        # linked it in between: os.link fails and save() locks that copy
+        real_open_locked = store._open_locked
+        calls = []
+
+        def racing_open_locked(path):
+            calls.append(path)
+            return None if len(calls) == 1 else real_open_locked(path)
+
+        monkeypatch.setattr(store, "_open_locked", racing_open_locked)
+        with store.save(Upload(b"same"), "mp3") as (second, _, is_new):
+            assert not is_new and second == first
+            assert second.stat().st_ino == inode
+        assert len(calls) == 2
+
+
+def test_open_locked_rejects_a_file_evicted_while_waiting(store, tmp_path):
+    path = tmp_path / "evicted.wav"
+    path.write_bytes(b"x")
+    result = {}
+
+    with open(path, "rb") as evictor:
+        fcntl.flock(evictor, fcntl.LOCK_EX)
+        waiter = threading.Thread(target=lambda: result.update(f=store._open_locked(path)))
+        waiter.start()
+        time.sleep(0.1)  # let it block on the shared lock
+        path.unlink()
+    waiter.join(timeout=5)
+
+    assert result["f"] is None
+
+
+def test_concurrent_saves_and_evictions_never_lose_a_file_in_use(store):
+    errors = []
+
+    def upload(i):
+        try:
+            with store.save(Upload(bytes([i % 3]) * 5000), "mp3") as (path, _, _):
+                store.evict()
+                time.sleep(0.005)
+                assert len(path.read_bytes()) == 5000
+        except Exception as e:
+            errors.append(e)
+        finally:
+            store.evict()
+
+    threads = [threading.Thread(target=upload, args=(i,)) for i in range(40)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert stored_files(store) == []
+
+
+def test_stale_partial_uploads_are_swept(store, monkeypatch):
+    monkeypatch.setattr(upload_store, "STALE_PART_SECONDS", 60)
+    old = time.time() - 120
+
+    dead = store.root / ".incoming-dead.part"
+    live = store.root / ".incoming-live.part"
+    fresh = store.root / ".incoming-fresh.part"
+    for p in (dead, live, fresh):
+        p.write_bytes(b"x")
+    os.utime(dead, (old, old))
+    os.utime(live, (old, old))
+
+    with open(live, "rb") as f:
+        fcntl.flock(f, fcntl.LOCK_SH)  # an upload still streaming
+        store.evict()
+
+    assert not dead.exists()
+    assert live.exists() and fresh.exists()
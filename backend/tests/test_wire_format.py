@@ -0,0 +1,99 @@
+# test_wire_format.py - graph deltas and response compression
+
+import gzip
+import json
+
+import pytest
+from flask import Flask
+
+import wire_format
+from wire_format import GraphHistory, compress_response, encode_response
+
+
+def graph(concepts, edges=()):
+    return {
+        "concepts": [{"id": cid, "label": label} for cid, label in concepts],
+        "edges": [{"from": a, "to": b, "relation": "depends_on"} for a, b in edges]
+    }
+
+
+def test_versions_count_up_or_follow_the_given_one():
+    history = GraphHistory()
+    assert history.commit(graph([("C1", "A")])) == 1
+    assert history.commit(graph([("C1", "A")])) == 2
+    assert history.commit(graph([("C1", "A")]), version=7) == 7
+    assert history.version == 7
+
+
+def test_delta_after_add_and_remove():
+    history = GraphHistory()
+    v1 = history.commit(graph([("C1", "A"), ("C2", "B")], [("C1", "C2")]))
+    history.commit(graph([("C1", "A*"), ("C3", "C")], [("C1", "C3")]))
+
+    delta = history.delta(v1)
+    assert delta["delta"] and delta["base_version"] == v1 and delta["version"] == 2
+    assert delta["concepts"]["upsert"] == [{"id": "C1", "label": "A*"}, {"id": "C3", "label": "C"}]
+    assert delta["concepts"]["remove"] == ["C2"]
+    assert delta["edges"]["add"] == [{"from": "C1", "to": "C3", "relation": "depends_on"}]
+    assert delta["edges"]["remove"] == [{"from": "C1", "to": "C2", "relation": "depends_on"}]
+
+
+def test_delta_from_current_version_is_empty():
+    history = GraphHistory()
+    v = history.commit(graph([("C1", "A")]))
+    delta = history.delta(v)
+    assert delta["concepts"] == {"upsert": [], "remove": []}
+    assert delta["edges"] == {"add": [], "remove": []}
+
+
+def test_aged_out_version_has_no_delta():
+    history = GraphHistory(max_versions=3)
+    for i in range(5):
+        history.commit(graph([("C1", str(i))]))
+    assert history.delta(1) is None
+    assert history.delta(4) is not None
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.after_request(compress_response)
+
+    @app.route("/big")
+    def big():
+        return encode_response({"items": list(range(2000))})
+
+    @app.route("/small")
+    def small():
+        return encode_response({"ok": True})
+
+    return app.test_client()
+
+
+def test_gzip_when_accepted(client):
+    response = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(response.data))["items"][-1] == 1999
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+
+def test_q_zero_refuses_encoding(client):
+    response = client.get("/big", headers={"Accept-Encoding": "gzip;q=0"})
+    assert "Content-Encoding" not in response.headers
+    assert json.loads(response.data)["items"][-1] == 1999
+
+
+def test_refused_brotli_falls_back_to_gzip(client):
+    response = client.get("/big", headers={"Accept-Encoding": "br;q=0, gzip;q=0.5"})
+    assert response.headers["Content-Encoding"] == "gzip"
+
+
+@pytest.mark.skipif(wire_format.brotli is None, reason="brotli not installed")
+def test_brotli_preferred(client):
+    response = client.get("/big", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["Content-Encoding"] == "br"
+
+
+def test_small_and_unaccepted_responses_stay_plain(client):
+    assert "Content-Encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    assert "Content-Encoding" not in client.get("/big").headers
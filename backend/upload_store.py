@@ -0,0 +1,160 @@
+# upload_store.py - content-addressed upload storage with quota-based eviction
+
+import hashlib
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, but open files can't be deleted there
+    fcntl = None
+
+CHUNK_SIZE = 1024 * 1024
+PART_PREFIX = ".incoming-"
+# Partial uploads untouched for this long were left behind by a dead worker
+STALE_PART_SECONDS = 60 * 60
+
+
+def _lock_shared(f):
+    if fcntl is not None:
+        fcntl.flock(f, fcntl.LOCK_SH)
+
+
+class UploadStore:
+    """
+    Uploaded audio stored once per distinct content, evicted LRU under a quota.
+
+    Files are streamed to disk in chunks while being hashed and then named by
+    their SHA-256, so re-uploading the same recording reuses the stored copy.
+    save() holds a shared flock on the stored file from before it appears
+    under its final name until the caller is done with it; evict() skips
+    locked files, which also protects files in use by other worker processes.
+    Without fcntl (Windows) the open handle alone protects the file, since
+    open files can't be deleted there.
+    """
+
+    def __init__(self, root, max_bytes: int):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+    @contextmanager
+    def save(self, file_storage, extension: str):
+        """
+        Stream an uploaded file into the store and yield (path, sha256, is_new).
+
+        The stored file cannot be evicted until the with-block exits.
+        """
+        digest = hashlib.sha256()
+        tmp = self.root / f"{PART_PREFIX}{uuid.uuid4().hex}.part"
+        out = held = open(tmp, "wb")
+
+        try:
+            _lock_shared(out)
+            while True:
+                chunk = file_storage.stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+            out.flush()
+
+            sha = digest.hexdigest()
+            path = self.root / f"{sha}.{extension.lower()}"
+
+            while True:
+                existing = self._open_locked(path)
+                if existing is not None:
+                    held, is_new = existing, False
+                    break
+                try:
+                    # Unlike os.replace this never clobbers a copy stored
+                    # (and locked) by a concurrent upload of the same file
+                    os.link(tmp, path)
+                    is_new = True
+                    break
+                except FileExistsError:
+                    continue
+
+            try:
+                tmp.unlink()
+            except PermissionError:  # Windows: still open, removed below
+                pass
+            os.utime(path)  # counts as a use for LRU eviction
+            yield path, sha, is_new
+        finally:
+            out.close()
+            held.close()
+            tmp.unlink(missing_ok=True)
+
+    def _open_locked(self, path: Path):
+        """Open a stored file with a shared lock, or None if it isn't stored."""
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        _lock_shared(f)
+        try:
+            stored = os.stat(path).st_ino == os.fstat(f.fileno()).st_ino
+        except FileNotFoundError:
+            stored = False
+        if not stored:  # evicted while we waited for the lock
+            f.close()
+            return None
+        return f
+
+    def _try_remove(self, path: Path) -> bool:
+        try:
+            if fcntl is None:
+                path.unlink()  # fails while an upload has the file open
+                return True
+            with open(path, "rb") as f:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                path.unlink()
+            return True
+        except (BlockingIOError, FileNotFoundError, PermissionError):
+            return False
+
+    def usage(self):
+        """Stored files (oldest use first) and their total size in bytes."""
+        files = []
+        for p in self.root.iterdir():
+            if p.name.startswith("."):
+                continue
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            files.append((st.st_mtime, st.st_size, p))
+        files.sort()
+        return files, sum(size for _, size, _ in files)
+
+    def _sweep_parts(self):
+        """Remove partial uploads left behind by crashed workers."""
+        cutoff = time.time() - STALE_PART_SECONDS
+        for p in self.root.glob(f"{PART_PREFIX}*.part"):
+            try:
+                stale = p.stat().st_mtime < cutoff
+            except FileNotFoundError:
+                continue
+            # A live upload still holds its lock on the part file
+            if stale and self._try_remove(p):
+                print(f"Removed stale partial upload {p.name}")
+
+    def evict(self):
+        """Delete least recently used files until usage fits the quota."""
+        self._sweep_parts()
+        files, total = self.usage()
+        freed = 0
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            if self._try_remove(path):
+                total -= size
+                freed += size
+        if freed:
+            print(f"Evicted {freed / 1e6:.1f} MB of uploads ({total / 1e6:.1f} MB kept)")
+        return freed
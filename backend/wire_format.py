@@ -0,0 +1,136 @@
+# wire_format.py - response encoding, compression and graph deltas
+
+import gzip
+import json
+from collections import OrderedDict
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # optional: fall back to gzip only
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:  # optional: fall back to JSON only
+    msgpack = None
+
+MSGPACK_MIMETYPE = "application/x-msgpack"
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def encode_response(payload, status: int = 200):
+    """Encode payload as MessagePack if the client asked for it, else compact JSON."""
+    wants_msgpack = (
+        request.args.get("format") == "msgpack"
+        or request.accept_mimetypes.best_match(["application/json", MSGPACK_MIMETYPE]) == MSGPACK_MIMETYPE
+    )
+
+    if wants_msgpack and msgpack is not None:
+        body = msgpack.packb(payload, use_bin_type=True)
+        return Response(body, status=status, mimetype=MSGPACK_MIMETYPE)
+
+    body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+    return Response(body, status=status, mimetype="application/json")
+
+
+def _accepted_encodings():
+    """Map of content-coding -> q value from the Accept-Encoding header."""
+    accepted = {}
+    for part in request.headers.get("Accept-Encoding", "").split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    return accepted
+
+
+def compress_response(response):
+    """after_request hook: brotli or gzip encode API responses when accepted."""
+    if (
+        response.direct_passthrough
+        or response.status_code < 200
+        or response.status_code >= 300
+        or "Content-Encoding" in response.headers
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+
+    data = response.get_data()
+    if len(data) < MIN_COMPRESS_BYTES:
+        return response
+
+    accepted = _accepted_encodings()
+    if brotli is not None and accepted.get("br", 0) > 0:
+        encoding, body = "br", brotli.compress(data, quality=BROTLI_QUALITY)
+    elif accepted.get("gzip", 0) > 0:
+        encoding, body = "gzip", gzip.compress(data, compresslevel=GZIP_LEVEL)
+    else:
+        return response
+
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def _edge_key(edge):
+    return (edge["from"], edge["to"], edge["relation"])
+
+
+class GraphHistory:
+    """
+    Versioned snapshots of the current graph, used to answer delta requests.
+
+    Only the last max_versions snapshots are kept; a client whose version has
+    aged out gets a full response instead of a delta.
+    """
+
+    def __init__(self, max_versions: int = 20):
+        self.max_versions = max_versions
+        self.version = 0
+        self._snapshots = OrderedDict()
+        self._snapshots[0] = ({}, {})
+
+    def commit(self, graph, version=None) -> int:
+        """Record graph as the next (or the given) version and return its number."""
+        concepts = {c["id"]: dict(c) for c in graph.get("concepts", [])}
+        edges = {_edge_key(e): dict(e) for e in graph.get("edges", [])}
+
+        self.version = self.version + 1 if version is None else version
+        self._snapshots[self.version] = (concepts, edges)
+        while len(self._snapshots) > self.max_versions:
+            self._snapshots.popitem(last=False)
+        return self.version
+
+    def delta(self, since: int):
+        """Changes from version since to the latest, or None if unavailable."""
+        if since not in self._snapshots:
+            return None
+
+        old_concepts, old_edges = self._snapshots[since]
+        new_concepts, new_edges = self._snapshots[self.version]
+
+        return {
+            "version": self.version,
+            "base_version": since,
+            "delta": True,
+            "concepts": {
+                "upsert": [c for cid, c in new_concepts.items() if old_concepts.get(cid) != c],
+                "remove": [cid for cid in old_concepts if cid not in new_concepts]
+            },
+            "edges": {
+                "add": [e for key, e in new_edges.items() if key not in old_edges],
+                "remove": [e for key, e in old_edges.items() if key not in new_edges]
+            }
+        }
@@ -0,0 +1,50 @@
+"""
+Production entry point for pre-forked serving.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+gunicorn imports this module once in the master process (preload_app), so the
+Whisper weights and agent clients loaded here are inherited by every worker
+copy-on-write instead of being loaded again per process.
+"""
+
+import gc
+import os
+
+import torch
+
+# Workers share the current graph and transcripts through this directory
+os.environ.setdefault("MINDMAP_STATE_DIR", "state")
+
+from api import app  # noqa: E402  (also builds the agent LLM clients)
+from audio_detection import load_model, policy_model_sizes, QUANTIZE_ON_CPU  # noqa: E402
+
+
+def preload_models():
+    """
+    Load the Whisper models workers are expected to use.
+
+    By default every size the duration policy can pick (up to
+    WHISPER_MAX_MODEL), in the same float32/int8 mode audio_to_text uses.
+    """
+    policy_sizes = policy_model_sizes()
+    preload = os.getenv("WHISPER_PRELOAD")
+    sizes = [s.strip() for s in preload.split(",") if s.strip()] if preload else policy_sizes
+
+    missing = [s for s in policy_sizes if s not in sizes]
+    if missing:
+        print(f"Warning: Whisper models {', '.join(missing)} are not preloaded; "
+              f"each worker will load them on first use")
+
+    quantized = QUANTIZE_ON_CPU and not torch.cuda.is_available()
+    for size in sizes:
+        print(f"Preloading Whisper model: {size}{' (int8)' if quantized else ''}")
+        load_model(size, quantized)
+
+
+preload_models()
+
+# Objects created so far live for the whole process; moving them out of the
+# collector's generations stops gc passes in workers from touching (and so
+# copying) their pages.
+gc.freeze()
@@ -50,6 +50,7 @@ const CustomNode = ({ data, id }) => {
   const isHighlighted = data.isHighlighted;
   const isFaded = data.isFaded;
   const opacity = isFaded ? 0.2 : 1;
+  const isCluster = data.isCluster;
   
   const handleStyle = {
     background: '#60a5fa',
@@ -66,7 +67,7 @@ const CustomNode = ({ data, id }) => {
       borderRadius: '50%',
       width: `${size}px`,
       height: `${size}px`,
-      border: `2px solid ${borderColor}`,
+      border: isCluster ? '3px dashed rgba(255,255,255,0.8)' : `2px solid ${borderColor}`,
       boxShadow: connectionCount >= 3 ? '0 8px 24px rgba(0,0,0,0.2)' : '0 4px 12px rgba(0,0,0,0.1)',
       display: 'flex',
       alignItems: 'center',
@@ -92,6 +93,11 @@ const CustomNode = ({ data, id }) => {
         fontFamily: 'system-ui, "Segoe UI", Tahoma, Arial, sans-serif',
       }}>
         {data.label}
+        {isCluster && (
+          <div style={{ fontSize: '11px', fontWeight: '500', opacity: 0.85, marginTop: '4px' }}>
+            +{data.size - 1} more · double-click
+          </div>
+        )}
       </div>
       
       <Handle type="source" position={Position.Left} id="left" style={handleStyle} />
@@ -114,6 +120,8 @@ export default function App() {
   const [selectedNode, setSelectedNode] = useState(null);
   const [highlightedNodeId, setHighlightedNodeId] = useState(null);
   const [showConfirmClear, setShowConfirmClear] = useState(false);
+  // Graph the clusters on screen belong to, so expansions can't mix lectures
+  const [loadedGraph, setLoadedGraph] = useState(null);
 
   const fileInputRef = useRef(null);
 
@@ -245,6 +253,7 @@ export default function App() {
       setEdges([]);
       setSelectedNode(null);
       setHighlightedNodeId(null);
+      setLoadedGraph(null);
     }
   };
 
@@ -442,6 +451,116 @@ export default function App() {
     return { positions, limitedEdges: categorizedEdges, roots };
   };
 
+  const toFlowNode = (concept, position, connectionCount, isRoot = false) => ({
+    id: concept.id,
+    type: 'custom',
+    data: { 
+      label: concept.label, 
+      description: concept.description,
+      isRoot,
+      isCluster: !!concept.is_cluster,
+      size: concept.size || 1,
+      connectionCount,
+    },
+    position,
+  });
+
+  const toFlowEdge = (edge, type = 'smoothstep') => ({
+    id: `e-${edge.from}-${edge.to}`,
+    source: edge.from,
+    target: edge.to,
+    sourceHandle: edge.sourceHandle,
+    targetHandle: edge.targetHandle,
+    type,
+    animated: false,
+    markerEnd: {
+      type: 'arrowclosed',
+      color: '#94a3b8',
+      width: 18,
+      height: 18,
+    },
+    style: { 
+      strokeWidth: 2.5, 
+      stroke: '#94a3b8',
+    },
+  });
+
+  // Replace a cluster node with its children, fetched from the backend on demand
+  const expandCluster = async (clusterNode) => {
+    const visible = nodes.map((n) => n.id);
+    setStatus(`Expanding ${clusterNode.data.label}...`);
+
+    try {
+      if (!loadedGraph) {
+        setStatus('❌ This group is not from an uploaded lecture');
+        return;
+      }
+      const params = new URLSearchParams({
+        visible: visible.join(','),
+        graph_id: loadedGraph.graphId,
+        version: loadedGraph.version,
+      });
+      const response = await fetch(`${API_BASE}/clusters/${encodeURIComponent(clusterNode.id)}?${params}`);
+      const result = await response.json();
+
+      if (response.status === 409) {
+        setStatus('❌ Another lecture has been loaded since — upload this one again to expand it');
+        return;
+      }
+      if (!response.ok) {
+        setStatus(`❌ ${result.error || 'Could not expand cluster'}`);
+        return;
+      }
+
+      const positions = new Map(nodes.map((n) => [n.id, n.position]));
+      const center = clusterNode.position;
+      const radius = 200 + result.concepts.length * 20;
+      result.concepts.forEach((concept, i) => {
+        const angle = (i / result.concepts.length) * 2 * Math.PI - Math.PI / 2;
+        positions.set(concept.id, {
+          x: center.x + radius * Math.cos(angle),
+          y: center.y + radius * Math.sin(angle),
+        });
+      });
+
+      const keptEdges = edges.filter(
+        (edge) => edge.source !== clusterNode.id && edge.target !== clusterNode.id
+      );
+      const newEdges = result.edges.map((edge) => {
+        const handles = getBestHandles(positions.get(edge.from), positions.get(edge.to));
+        return toFlowEdge({ ...edge, ...handles }, 'straight');
+      });
+      const allEdges = [...keptEdges, ...newEdges];
+
+      const connectionCounts = new Map();
+      allEdges.forEach((edge) => {
+        connectionCounts.set(edge.source, (connectionCounts.get(edge.source) || 0) + 1);
+        connectionCounts.set(edge.target, (connectionCounts.get(edge.target) || 0) + 1);
+      });
+
+      const keptNodes = nodes
+        .filter((n) => n.id !== clusterNode.id)
+        .map((n) => ({ ...n, data: { ...n.data, connectionCount: connectionCounts.get(n.id) || 0 } }));
+      const childNodes = result.concepts.map((concept) =>
+        toFlowNode(concept, positions.get(concept.id), connectionCounts.get(concept.id) || 0)
+      );
+
+      setNodes([...keptNodes, ...childNodes]);
+      setEdges(allEdges);
+      setSelectedNode(null);
+      setHighlightedNodeId(null);
+      setStatus(`Expanded ${clusterNode.data.label} into ${result.concepts.length} nodes`);
+    } catch (error) {
+      setStatus(`❌ Server Error`);
+    }
+  };
+
+  const onNodeDoubleClick = (event, node) => {
+    if (node.data.isCluster) {
+      expandCluster(node);
+    }
+  };
+
   const onAudioSelected = async (e) => {
     const file = e.target.files?.[0];
     if (!file) return;
@@ -470,41 +589,21 @@ export default function App() {
           connectionCounts.set(edge.to, (connectionCounts.get(edge.to) || 0) + 1);
         });
         
-        const newNodes = result.data.concepts.map((concept) => ({
-          id: concept.id,
-          type: 'custom',
-          data: { 
-            label: concept.label, 
-            description: concept.description,
-            isRoot: roots.some(r => r.id === concept.id),
-            connectionCount: connectionCounts.get(concept.id) || 0,
-          },
-          position: positions.get(concept.id) || { x: 0, y: 0 },
-        }));
+        const newNodes = result.data.concepts.map((concept) => toFlowNode(
+          concept,
+          positions.get(concept.id) || { x: 0, y: 0 },
+          connectionCounts.get(concept.id) || 0,
+          roots.some(r => r.id === concept.id),
+        ));
         
         setNodes(newNodes);
+        setLoadedGraph({ graphId: result.graph_id, version: result.version });
         
         // Create edges: straight for adjacent, smoothstep curves around nodes for long distance
-        setEdges(limitedEdges.map((e, i) => ({
-          id: `e${i}`,
-          source: e.from,
-          target: e.to,
-          sourceHandle: e.sourceHandle,
-          targetHandle: e.targetHandle,
-          type: e.isAdjacent ? 'straight' : 'smoothstep',
-          animated: false,
-          markerEnd: {
-            type: 'arrowclosed',
-            color: '#94a3b8',
-            width: 18,
-            height: 18,
-          },
-          style: { 
-            strokeWidth: 2.5, 
-            stroke: '#94a3b8',
-          },
-        })));
-        setStatus(`Found ${limitedEdges.length} connections !!`);
+        setEdges(limitedEdges.map((e) => toFlowEdge(e, e.isAdjacent ? 'straight' : 'smoothstep')));
+        setStatus(result.clustered
+          ? `Showing ${result.stats.concepts} concepts as ${newNodes.length} groups — double-click a group to expand`
+          : `Found ${limitedEdges.length} connections !!`);
       }
     } catch (error) {
       setStatus(`❌ Server Error`);
@@ -668,6 +767,7 @@ export default function App() {
           onEdgesChange={onEdgesChange}
           onConnect={onConnect}
           onNodeClick={onNodeClick}
+          onNodeDoubleClick={onNodeDoubleClick}
           onPaneClick={onPaneClick}
           nodeTypes={nodeTypes}
           fitView